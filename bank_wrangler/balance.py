@@ -0,0 +1,59 @@
+"""
+Per-account balance index.
+
+For each account we keep the distinct transaction dates in sorted order
+alongside a prefix sum of the net flow through the end of each date, so
+both as-of-date balances and date-range net flows are a binary search.
+"""
+
+
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from decimal import Decimal
+
+
+class BalanceIndex:
+    def __init__(self, transactions):
+        deltas = defaultdict(lambda: defaultdict(Decimal))
+        for t in transactions:
+            if t.to != '':
+                deltas[t.to][t.date] += t.amount
+            if t.source != '':
+                deltas[t.source][t.date] -= t.amount
+        self._dates = {}
+        self._sums = {}
+        for account, by_date in deltas.items():
+            dates = sorted(by_date)
+            sums = []
+            total = Decimal('0')
+            for date in dates:
+                total += by_date[date]
+                sums.append(total)
+            self._dates[account] = dates
+            self._sums[account] = sums
+
+    def accounts(self):
+        return list(self._dates)
+
+    def _through(self, account, i):
+        """Sum of the first i dates of account."""
+        if i == 0:
+            return Decimal('0')
+        return self._sums[account][i - 1]
+
+    def balance(self, account, as_of=None):
+        """The balance of account at the end of the day as_of (default: all
+        time). Unknown accounts have a zero balance."""
+        if account not in self._dates:
+            return Decimal('0')
+        if as_of is None:
+            return self._through(account, len(self._dates[account]))
+        return self._through(account, bisect_right(self._dates[account], as_of))
+
+    def net_flow(self, account, start, end):
+        """Net amount into account over the dates start..end inclusive."""
+        if account not in self._dates:
+            return Decimal('0')
+        dates = self._dates[account]
+        return (self._through(account, bisect_right(dates, end)) -
+                self._through(account, bisect_left(dates, start)))
@@ -2,20 +2,115 @@ import datetime
 import time
 import os
 from decimal import Decimal
+from typing import NamedTuple
 from selenium import webdriver
+from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from bank_wrangler import schema
+from bank_wrangler import schema, trace
+from bank_wrangler.balance import BalanceIndex
+
+
+class BrowserPolicy(NamedTuple):
+    """
+    How a scraping backend runs Firefox: headless or not, and which kinds of
+    requests the profile blocks. Backends set their own in BROWSER_POLICY.
+    """
+    name: str = 'lean'
+    headless: bool = True
+    block_images: bool = True
+    block_media: bool = True
+    block_fonts: bool = True
+    block_trackers: bool = True
+
+    def apply(self, profile):
+        """Set the profile preferences for this policy."""
+        if self.block_images:
+            profile.set_preference('permissions.default.image', 2)
+        if self.block_media:
+            profile.set_preference('media.autoplay.default', 5)
+            profile.set_preference('media.preload.default', 0)
+            profile.set_preference('media.preload.auto', 0)
+        if self.block_fonts:
+            profile.set_preference('gfx.downloadable_fonts.enabled', False)
+            profile.set_preference('browser.display.use_document_fonts', 0)
+        if self.block_trackers:
+            # Firefox's built in lists of ad, analytics and social trackers
+            profile.set_preference('privacy.trackingprotection.enabled', True)
+            profile.set_preference('privacy.trackingprotection.socialtracking.enabled', True)
+            profile.set_preference('privacy.trackingprotection.cryptomining.enabled', True)
+            profile.set_preference('privacy.trackingprotection.fingerprinting.enabled', True)
+
+    def options(self):
+        options = webdriver.FirefoxOptions()
+        if self.headless:
+            options.add_argument('-headless')
+        return options
+
+
+LEAN = BrowserPolicy()
+
+# A visible browser loading everything, as before policies, for debugging.
+FULL = BrowserPolicy('full', False, False, False, False, False)
+
+POLICIES = {'lean': LEAN, 'full': FULL}
+
+_override = None
+
+
+def override_policy(policy):
+    """Use policy for every backend instead of its own BROWSER_POLICY."""
+    global _override
+    _override = policy
+
+
+def browser_policy(default):
+    return default if _override is None else _override
+
+
+def firefox(profile, policy):
+    """Start Firefox with profile, after applying policy to it."""
+    policy.apply(profile)
+    driver = webdriver.Firefox(firefox_profile=profile, options=policy.options())
+    driver.policy = policy
+    return driver
+
+
+# The navigation's load time in ms, or null until its load event has ended.
+_LOAD_MS = '''
+const nav = performance.getEntriesByType('navigation')[0];
+return nav && nav.loadEventEnd > 0 ? nav.loadEventEnd - nav.startTime : null;
+'''
+
+
+def load_page(driver, url):
+    """
+    driver.get(url), recording the page load time in the trace along with
+    the policy in use, so runs with and without blocking can be compared.
+    The load time is None if the load event has not ended within 10s.
+    """
+    policy = getattr(driver, 'policy', None)
+    with trace.span('page load', url=url,
+                    policy=policy.name if policy else None) as s:
+        driver.get(url)
+        # get can return before the load event has finished, while
+        # loadEventEnd is still 0
+        try:
+            s['load_ms'] = WebDriverWait(driver, 10).until(
+                lambda d: d.execute_script(_LOAD_MS))
+        except TimeoutException:
+            s['load_ms'] = None
 
 
 class FirefoxDownloadDriver(webdriver.Firefox):
-    def __init__(self, download_dir, *mime_types):
+    def __init__(self, download_dir, *mime_types, policy=LEAN):
         """
         Create a Firefox webdriver that downloads into the path download_dir,
         and initiates downloads automatically for any of the given MIME types.
         """
         self.download_dir = download_dir
+        self.policy = policy
         self.profile = webdriver.FirefoxProfile()
         self.profile.set_preference('browser.helperApps.neverAsk.saveToDisk',
                                     ', '.join(mime_types))
@@ -24,7 +119,8 @@ class FirefoxDownloadDriver(webdriver.Firefox):
         self.profile.set_preference('browser.download.folderList', 2)
 
         self.profile.set_preference('browser.download.dir', self.download_dir)
-        super().__init__(self.profile)
+        policy.apply(self.profile)
+        super().__init__(firefox_profile=self.profile, options=policy.options())
 
     def grab_download(self, filename, timeout_seconds):
         """
@@ -75,20 +171,25 @@ def compute_balance(account, transactions):
 
 
 def correct_balance(account, real_balance, transactions):
-    correction = Decimal(real_balance) - compute_balance(account, transactions)
+    index = BalanceIndex(transactions)
+    balance = index.balance(account)
+    correction = Decimal(real_balance) - balance
     frm, to = '', account
     if correction != 0:
         if correction < 0:
             frm, to = to, frm
             correction *= -1
-        transactions.append(schema.Transaction(
+        fix = schema.Transaction(
             frm,
             to,
             _oldest_transaction_date(transactions),
             'Balance correction',
             correction,
-        ))
-    assert real_balance == compute_balance(account, transactions)
+        )
+        transactions.append(fix)
+        # the index is built once; only the correction's own flow is added
+        balance += BalanceIndex([fix]).balance(account)
+    assert real_balance == balance
 
 
 def assert_issubset(small, large):
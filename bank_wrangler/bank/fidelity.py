@@ -9,15 +9,19 @@ Other possibibilities:
 """
 
 
-from io import BytesIO
 from decimal import Decimal
+from shutil import copyfileobj
+from tempfile import SpooledTemporaryFile
 from bank_wrangler.config import ConfigField
-from bank_wrangler import schema
+from bank_wrangler import datafile, schema
 from bank_wrangler.bank.common import correct_balance
 from ofxtools.Client import OFXClient, InvStmtRq
 from ofxtools.Parser import OFXTree
 
 
+OFX_URL = 'https://ofx.fidelity.com/ftgw/OFX/clients/download'
+
+
 def name():
     return 'Fidelity'
 
@@ -33,7 +37,7 @@ def empty_config():
 def fetch(config, fileobj):
     username, password, accts = config
     client = OFXClient(
-        'https://ofx.fidelity.com/ftgw/OFX/clients/download',
+        OFX_URL,
         userid=username.value,
         org='fidelity.com', fid='7776', brokerid='fidelity.com')
     accts = accts.value.split(',')
@@ -76,7 +80,15 @@ def _statement_transactions(st):
 
 def transactions_by_account(fileobj):
     parser = OFXTree()
-    parser.parse(fileobj.buffer)
+    # ofxtools rewinds its source. Plain, encrypted and gzip data files can
+    # seek; zstd ones are spooled, to disk once they outgrow a chunk.
+    if fileobj.buffer.seekable():
+        parser.parse(fileobj.buffer)
+    else:
+        with SpooledTemporaryFile(max_size=datafile.CHUNK_SIZE) as spool:
+            copyfileobj(fileobj.buffer, spool)
+            spool.seek(0)
+            parser.parse(spool)
     ofx = parser.convert()
     result = {}
     for st in ofx.statements:
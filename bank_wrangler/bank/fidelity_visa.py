@@ -9,8 +9,11 @@ import shutil
 import tempfile
 from bank_wrangler.bank.common import (
     FirefoxDownloadDriver,
+    LEAN,
+    browser_policy,
     fidelity_login,
     correct_balance,
+    load_page,
 )
 from bank_wrangler.config import ConfigField
 from bank_wrangler import schema
@@ -22,6 +25,10 @@ from selenium.webdriver.support import expected_conditions as EC
 # How many months back the server allows us to download transaction data.
 ALLOWED_DOWNLOAD_MONTHS = 18
 
+LOGIN_URL = 'https://www.fidelity.com'
+
+BROWSER_POLICY = LEAN
+
 
 def name():
     return 'Fidelity Visa'
@@ -66,8 +73,9 @@ def _start_date_string(end_date_string):
 def _download(config, tempdir):
     username, password, lastfour = config
 
-    driver = FirefoxDownloadDriver(tempdir, 'application/x-csv')
-    driver.get('https://www.fidelity.com')
+    driver = FirefoxDownloadDriver(tempdir, 'application/x-csv',
+                                   policy=browser_policy(BROWSER_POLICY))
+    load_page(driver, LOGIN_URL)
     fidelity_login(driver, username.value, password.value)
 
     # Wait for content.
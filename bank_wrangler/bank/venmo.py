@@ -5,13 +5,26 @@ import json
 from datetime import datetime
 from decimal import Decimal
 from selenium.webdriver.firefox.firefox_profile import FirefoxProfile
-from selenium.webdriver import Firefox
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support.expected_conditions import title_contains
 from bank_wrangler.config import ConfigField
-from bank_wrangler.bank.common import compute_balance
-from bank_wrangler import schema
+from bank_wrangler.bank.common import (
+    BrowserPolicy,
+    browser_policy,
+    compute_balance,
+    firefox,
+    load_page,
+)
+from bank_wrangler import jsonstream, schema
+
+
+SIGN_IN_URL = 'https://venmo.com/account/sign-in/'
+HISTORY_URL = 'https://api.venmo.com/v1/transaction-history'
+
+# Tracking protection stays off: the sign-in page's risk checks load from
+# third parties, and failing them means a verification prompt.
+BROWSER_POLICY = BrowserPolicy('lean, trackers allowed', block_trackers=False)
 
 
 def name():
@@ -52,9 +65,9 @@ def fetch(config, fileobj):
     profile = FirefoxProfile(_firefox_default_profile())
     # disable a json viewer that's enabled by default in firefox 53+.
     profile.set_preference('devtools.jsonview.enabled', False)
-    driver = Firefox(profile)
-    
-    driver.get('https://venmo.com/account/sign-in/')
+    driver = firefox(profile, browser_policy(BROWSER_POLICY))
+
+    load_page(driver, SIGN_IN_URL)
     user_elem = driver.find_element_by_name('phoneEmailUsername')
     user_elem.clear()
     user_elem.send_keys(user.value)
@@ -66,8 +79,8 @@ def fetch(config, fileobj):
     WebDriverWait(driver, 15).until(title_contains('Welcome'))
 
     params = '?start_date=2009-01-01&end_date={}-01-01'.format(datetime.now().year + 1)
-    url = 'https://api.venmo.com/v1/transaction-history' + params
-    driver.get(url)
+    url = HISTORY_URL + params
+    load_page(driver, url)
 
     # validate json and raise ValueError on failure.
     pre = driver.find_element_by_tag_name('pre').text
@@ -78,58 +91,80 @@ def fetch(config, fileobj):
     fileobj.write(pre)
 
 
+def _transactions(account, transaction):
+    """The Transactions of one entry of the transaction history."""
+    date_string, _ = transaction['datetime_created'].split('T')
+    date = schema.Date(*map(int, date_string.split('-')))
+    if transaction['payment'] is not None:
+        a = transaction['payment']['actor']['username']
+        b = transaction['payment']['target']['user']['username']
+        action = transaction['payment']['action']
+        if a == account:
+            other = b
+            b = ''
+        elif b == account:
+            other = a
+            a = ''
+        else:
+            assert False
+        if action == 'pay':
+            from_to = [a, b]
+        else:
+            assert action == 'charge'
+            from_to = [b, a]
+    elif transaction['capture'] is not None:
+        assert transaction['capture']['authorization']['user']['username'] == account
+        transaction['note'] = transaction['capture']['authorization']['descriptor']
+        other = transaction['note']
+        from_to = [account, '']
+    else:
+        assert False
+
+    # descriptions are left empty and rendered from meta for display
+    result = []
+    raw_id = str(transaction['id'])
+    funding = transaction.get('funding_source')
+    funding_name = '' if funding is None else funding['name']
+    if funding is not None and funding['name'] != 'Venmo balance':
+        assert from_to[0] == account
+        result.append(schema.Transaction(
+            '',
+            account,
+            date,
+            '',
+            Decimal(transaction['amount']),
+            meta=schema.Meta(funding_name, 'fund ' + transaction['note'],
+                             funding_name, raw_id)))
+    result.append(schema.Transaction(
+        from_to[0],
+        from_to[1],
+        date,
+        '',
+        Decimal(transaction['amount']),
+        meta=schema.Meta(other, transaction['note'], funding_name, raw_id)))
+    return result
+
+
 def transactions_by_account(fileobj):
     result = []
     account = fileobj.readline().rstrip('\n')
-    data = json.load(fileobj, parse_float=Decimal)['data']
+    # the history is read one transaction at a time rather than loaded whole
+    data = {}
+    reader = jsonstream.Reader(fileobj, parse_float=Decimal)
+    for key in reader.keys():
+        if key != 'data':
+            reader.value()
+            continue
+        for key in reader.keys():
+            if key == 'transactions':
+                for _ in reader.items():
+                    result.extend(_transactions(account, reader.value()))
+            else:
+                data[key] = reader.value()
 
     # not sure if this is a valid assumption, but i'd rather wait for
     # it to break than introduce maybe dead code for injecting a
     # a starting balance.
     assert data['start_balance'] == 0
-
-    for transaction in data['transactions']:
-        date_string, _ = transaction['datetime_created'].split('T')
-        date = schema.Date(*map(int, date_string.split('-')))
-        if transaction['payment'] is not None:
-            a = transaction['payment']['actor']['username']
-            b = transaction['payment']['target']['user']['username']
-            action = transaction['payment']['action']
-            if a == account:
-                other = b
-                b = ''
-            elif b == account:
-                other = a
-                a = ''
-            else:
-                assert False
-            if action == 'pay':
-                from_to = [a, b]
-            else:
-                assert action == 'charge'
-                from_to = [b, a]
-        elif transaction['capture'] is not None:
-            assert transaction['capture']['authorization']['user']['username'] == account
-            transaction['note'] = transaction['capture']['authorization']['descriptor']
-            other = transaction['note']
-            from_to = [account, '']
-        else:
-            assert False
-
-        funding = transaction.get('funding_source')
-        if funding is not None and funding['name'] != 'Venmo balance':
-            assert from_to[0] == account
-            result.append(schema.Transaction(
-                '',
-                account,
-                date,
-                json.dumps({'other': funding['name'], 'note': 'fund ' + transaction['note']}),
-                Decimal(transaction['amount'])))
-        result.append(schema.Transaction(
-            from_to[0],
-            from_to[1],
-            date,
-            json.dumps({'other': other, 'note': transaction['note']}),
-            Decimal(transaction['amount'])))
     assert compute_balance(account, result) == data['end_balance']
     return {account: result}
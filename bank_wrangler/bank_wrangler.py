@@ -2,20 +2,35 @@
 
 import sys
 import os
-from itertools import chain
+import time
+import cProfile
+import datetime
+from decimal import Decimal, InvalidOperation
+from itertools import chain, islice
 from getpass import getpass
+from concurrent.futures import ProcessPoolExecutor
 import click
 from tabulate import tabulate
 from bank_wrangler.rules import Rules
 from bank_wrangler.config import Vault
 from bank_wrangler.config import Config
-from bank_wrangler.banks import BankInstance, generate_config
-from bank_wrangler import stitch, rules, schema, report
+from bank_wrangler.banks import (
+    BankInstance, FetchCheckpoint, generate_config, parse, recorded_bank,
+)
+from bank_wrangler.balance import BalanceIndex
+from bank_wrangler.bank.common import POLICIES, override_policy
+from bank_wrangler.database import Database, GROUPINGS
+from bank_wrangler import stitch, rules, schema, report, trace, output, columnar, suggest
+from bank_wrangler import budget, datafile, recurring, snapshot
+from bank_wrangler.watch import watch
+
+
+def _initialized(root):
+    return Rules(root).exists() and Vault(root).exists()
 
 
 def _assert_initialized():
-    root = os.getcwd()
-    if not Rules(root).exists() or not Vault(root).exists():
+    if not _initialized(os.getcwd()):
         print("fatal: directory must be initialized with `bank_wrangler init`",
               file=sys.stderr)
         sys.exit(1)
@@ -25,10 +40,125 @@ def _promptpass():
     return getpass('master passphrase: ')
 
 
+def _bank_names(root):
+    """
+    {key: bank name} for every config, from the plaintext fetch metadata so
+    that commands which only parse need no passphrase. Configs with no
+    recorded bank, e.g. fetched by an older version, are looked up in the
+    vault and recorded for next time.
+    """
+    result = {key: recorded_bank(root, key) for key in Vault(root).keys()}
+    missing = [key for key, bank in result.items() if bank is None]
+    if missing:
+        configs = Vault(root).get_all(_promptpass())
+        for key in missing:
+            result[key] = configs[key].bank
+            BankInstance(root, key, result[key]).record_bank()
+    return result
+
+
+def _data_key(root, passphrase=None, prefer_env=True):
+    """
+    The key of encrypted .data files, or None if they are not encrypted.
+    Taken from the environment if set there, otherwise decrypted with the
+    passphrase, which is prompted for if not given. If not prefer_env, as
+    for batch roots that each have a key of their own, the root's key is
+    decrypted whenever it has one and the environment's is the fallback.
+    """
+    store = datafile.KeyStore(root)
+    key = store.from_env()
+    if not store.exists() or (prefer_env and key is not None):
+        return key
+    return store.get(passphrase if passphrase is not None else _promptpass())
+
+
+def _parse_date(ctx, param, value):
+    """click callback parsing YYYY/MM/DD or YYYY-MM-DD into a schema.Date"""
+    if value is None:
+        return None
+    try:
+        year, month, day = value.replace('-', '/').split('/')
+        return schema.Date(year, month, day)
+    except ValueError:
+        raise click.BadParameter('expected a date like 2017/01/31')
+
+
+def _parse_month(ctx, param, value):
+    """click callback parsing YYYY/MM or YYYY-MM into a YYYY/MM string"""
+    if value is None:
+        return None
+    try:
+        year, month = map(int, value.replace('-', '/').split('/'))
+    except ValueError:
+        raise click.BadParameter('expected a month like 2017/01')
+    if not (1 <= year <= 9999 and 1 <= month <= 12):
+        raise click.BadParameter(f'no such month: {value}')
+    return '{:04}/{:02}'.format(year, month)
+
+
+def _parse_amount(ctx, param, value):
+    """click callback parsing a finite amount into a Decimal"""
+    if value is None:
+        return None
+    try:
+        amount = Decimal(value)
+    except InvalidOperation:
+        amount = None
+    if amount is None or not amount.is_finite():
+        raise click.BadParameter('expected an amount like 12.50')
+    return amount
+
+
+_AGE_UNITS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+
+
+def _parse_age(ctx, param, value):
+    """click callback parsing an age like 90s, 30m, 6h or 2d into seconds"""
+    if value is None:
+        return None
+    try:
+        if value[-1:] in _AGE_UNITS:
+            return float(value[:-1]) * _AGE_UNITS[value[-1]]
+        return float(value)
+    except ValueError:
+        raise click.BadParameter('expected an age like 30m, 6h or 2d')
+
+
+def _format_age(seconds):
+    for unit in 'dhm':
+        if seconds >= _AGE_UNITS[unit]:
+            return f'{seconds / _AGE_UNITS[unit]:.1f}{unit}'
+    return f'{seconds:.0f}s'
+
+
 @click.group()
-def cli():
+@click.option('--trace', 'trace_path', type=click.Path(dir_okay=False),
+              help='Write a Chrome trace of the pipeline stages to this file.')
+@click.option('--profile', 'profile_path', type=click.Path(dir_okay=False),
+              help='Write cProfile stats for the run to this file.')
+@click.option('--verify-stitch', is_flag=True,
+              help='Check the incremental stitch against a full stitch.')
+@click.option('--browser', type=click.Choice(['backend', *POLICIES]),
+              default='backend', show_default=True,
+              help="Browser policy of scraping backends: each backend's own, "
+                   "lean (headless, blocking images, media, fonts and "
+                   "trackers) or full (visible, loading everything).")
+@click.pass_context
+def cli(ctx, trace_path, profile_path, verify_stitch, browser):
     """Wrangles banks, what can I say."""
-    pass
+    ctx.obj = {'verify_stitch': verify_stitch}
+    if browser != 'backend':
+        override_policy(POLICIES[browser])
+    if trace_path is not None:
+        trace.enable()
+        ctx.call_on_close(lambda: trace.write(trace_path))
+    if profile_path is not None:
+        profiler = cProfile.Profile()
+        profiler.enable()
+        def dump():
+            profiler.disable()
+            profiler.dump_stats(profile_path)
+        ctx.call_on_close(dump)
 
 
 @cli.command()
@@ -66,6 +196,7 @@ def add(name):
     passphrase = _promptpass()
     cfg = generate_config()
     vault.put(name, cfg, passphrase)
+    BankInstance(os.getcwd(), name, cfg.bank).record_bank()
 
 
 @config.command()
@@ -82,19 +213,45 @@ def remove(name):
         sys.exit(1)
 
 
-def _fetch(only_key=None):
+def _fetch(only_key=None, resume=False, max_age=None, force=False):
+    root = os.getcwd()
     _assert_initialized()
     passphrase = _promptpass()
-    vault = Vault(os.getcwd())
-    items = vault.get_all(passphrase).items()
+    configs = Vault(root).get_all(passphrase)
+    items = configs.items()
     if only_key is not None:
         items = [(k, c) for k, c in items if k == only_key]
         if len(items) == 0:
-            print('unknown name ' + key, file=sys.stderr)
+            print('unknown name ' + only_key, file=sys.stderr)
             sys.exit(1)
+    data_key = _data_key(root, passphrase)
+    checkpoint = FetchCheckpoint(root)
+    if resume and not force:
+        done = checkpoint.done()
+    else:
+        done = set()
+        if only_key is None:
+            checkpoint.clear()
     for name, cfg in items:
+        instance = BankInstance(root, name, cfg.bank, data_key)
+        if not force and name in done:
+            print(f'skipping {name}: fetched by the interrupted run')
+            continue
+        age = instance.age()
+        if not force and max_age is not None and age is not None and age < max_age:
+            print(f'skipping {name}: fetched {_format_age(age)} ago')
+            continue
         print(f'fetching {name}... ')
-        BankInstance(os.getcwd(), name, cfg).fetch()
+        instance.fetch(cfg.fields)
+        metadata = instance.metadata()
+        print(f'fetched {name}: {metadata["bytes"]} bytes '
+              f'in {metadata["duration"]:.1f}s')
+        if only_key is None:
+            checkpoint.add(name)
+    if only_key is None:
+        checkpoint.clear()
+    banks = {key: cfg.bank for key, cfg in configs.items()}
+    _sync_index(root, banks, data_key)
 
 
 @cli.command()
@@ -105,40 +262,429 @@ def fetch(name):
 
 
 @cli.command(name='fetch-all')
-def fetch_all():
+@click.option('--resume', is_flag=True,
+              help='Skip banks already fetched by an interrupted run.')
+@click.option('--max-age', callback=_parse_age,
+              help='Skip banks fetched more recently than this, e.g. 6h.')
+@click.option('--force', is_flag=True,
+              help='Fetch every bank, ignoring --resume and --max-age.')
+def fetch_all(resume, max_age, force):
     """Fetch all transactions"""
-    _fetch()
+    _fetch(resume=resume, max_age=max_age, force=force)
 
 
-def _list_transactions():
+def _list_transactions(lazy=False):
+    _assert_initialized()
     root = os.getcwd()
-    vault = Vault(root)
+    return _pipeline(root, _bank_names(root), lazy, data_key=_data_key(root),
+                     verify=_verify_stitch())
+
+
+def _sync_database(root, transactions, inputs):
+    with trace.span('database sync') as s:
+        inserted, deleted = Database(root).sync(transactions, inputs)
+        s['rows'] = inserted + deleted
+    print(f'index updated: {inserted} added, {deleted} removed')
+
+
+def _sync_index(root, banks, data_key):
+    """Run the pipeline on banks ({key: bank name}) and sync the index."""
+    with snapshot.reader(root) as s:
+        inputs = _inputs(root, s, banks)
+    transactions, _ = _pipeline(root, banks, data_key=data_key,
+                                verify=_verify_stitch())
+    _sync_database(root, transactions, inputs)
+
+
+def _database(refresh=False):
+    """
+    The transaction index. Fetches keep it up to date; it is synced here
+    too if refresh, or if rules.py or a data file changed since its last
+    sync, e.g. after rules.py was edited or a fetch was interrupted.
+    """
     _assert_initialized()
-    passphrase = _promptpass()
-    items = vault.get_all(passphrase).items()
-    r = Rules(root).get_module()
-    transactions_by_account = {}
-    for key, conf in items:
-        for account, ts in BankInstance(root, key, conf).transactions_by_account().items():
+    root = os.getcwd()
+    database = Database(root)
+    banks = _bank_names(root)
+    with snapshot.reader(root) as s:
+        inputs = _inputs(root, s, banks)
+    if refresh or database.inputs() != inputs:
+        _sync_index(root, banks, _data_key(root))
+    return database
+
+
+def _parse_all(root, banks, pool=None, data_key=None):
+    """
+    Parse every bank in banks, a dict of config key to bank name, and apply
+    pre_stitch, in a process pool when there is more than one bank. The
+    data files are read from one snapshot, so a concurrent fetch is not
+    seen halfway. Returns {account: [Transaction]} in config order, and
+    {account: version} for StitchState, the version being that of rules.py
+    and the data file the account was parsed from (see _inputs).
+    """
+    with snapshot.reader(root) as s:
+        args = [(root, key, bank, trace.enabled(), data_key, s.path(key + '.data'))
+                for key, bank in banks.items()]
+        rules_version = _file_version(Rules(root).path)
+        file_versions = [_file_version(s.path(key + '.data')) for key in banks]
+        if pool is not None or len(args) > 1:
+            if pool is not None:
+                results = list(pool.map(parse, *zip(*args)))
+            else:
+                with ProcessPoolExecutor(min(len(args), os.cpu_count() or 1)) as pool:
+                    results = list(pool.map(parse, *zip(*args)))
+        else:
+            # in this process spans go straight to our own trace
+            results = [parse(root, key, bank, False, data_key, path)
+                       for root, key, bank, _, _, path in args]
+    transactions_by_account, versions = {}, {}
+    for (rows_by_account, events), file_version in zip(results, file_versions):
+        trace.extend(events)
+        for account, rows in rows_by_account.items():
             if account in transactions_by_account:
                 raise ValueError('account {} defined more than once'.format(account))
-            transactions_by_account[account] = map(r.pre_stitch, ts)
-    transactions = stitch.stitch(transactions_by_account)
-    transactions = map(r.post_stitch, transactions)
+            transactions_by_account[account] = list(map(schema.from_row, rows))
+            versions[account] = [rules_version, file_version]
+    return transactions_by_account, versions
+
+
+def _file_version(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return [path]
+    return [path, st.st_size, st.st_mtime_ns]
+
+
+def _inputs(root, s, keys):
+    """
+    A version of what the transactions are computed from: rules.py and the
+    data files of keys in s, a snapshot. Both are replaced, never changed
+    in place, so a file's path, size and mtime identify its contents.
+    """
+    paths = [Rules(root).path] + [s.path(key + '.data') for key in keys]
+    return [_file_version(path) for path in paths]
+
+
+def _verify_stitch():
+    return click.get_current_context().obj['verify_stitch']
+
+
+def _pipeline(root, banks, lazy=False, pool=None, data_key=None, verify=False):
+    """
+    Parse the banks ({key: bank name}), stitch and apply rules. Returns the
+    transactions and the account names. If lazy, post_stitch is applied as
+    the transactions are consumed. Parsing uses pool, a ProcessPoolExecutor,
+    if given, and data_key to decrypt encrypted data files. If verify, the
+    incremental stitch is checked against a full one.
+    """
+    r = Rules(root).get_module()
+    with trace.span('parse') as s:
+        transactions_by_account, versions = _parse_all(root, banks, pool, data_key)
+        s['rows'] = sum(map(len, transactions_by_account.values()))
+    with trace.span('stitch') as s:
+        transactions, s['groups_recomputed'] = stitch.StitchState(root).stitch(
+            transactions_by_account, versions, verify)
+        s['rows'] = len(transactions)
+    if lazy:
+        return map(r.post_stitch, transactions), list(transactions_by_account.keys())
+    with trace.span('post_stitch') as s:
+        transactions = list(map(r.post_stitch, transactions))
+        s['rows'] = len(transactions)
     return transactions, list(transactions_by_account.keys())
 
 
 @cli.command(name='list')
-def list_transactions():
+@click.option('--since', callback=_parse_date, help='First date to include.')
+@click.option('--limit', type=click.IntRange(0), help='Print at most this many transactions.')
+@click.option('--format', 'fmt', type=click.Choice(output.FORMATS),
+              default='table', show_default=True)
+def list_transactions(since, limit, fmt):
     """List transactions"""
-    transactions = _list_transactions()[0]
-    print(tabulate(transactions, headers=schema.Transaction._fields))
+    transactions = _list_transactions(lazy=True)[0]
+    if since is not None:
+        transactions = (t for t in transactions if t.date >= since)
+    if limit is not None:
+        transactions = islice(transactions, limit)
+    try:
+        output.write(fmt, map(schema.display_row, transactions),
+                     schema.DISPLAY_FIELDS, sys.stdout)
+        sys.stdout.flush()
+    except BrokenPipeError:
+        # the reader went away, e.g. `bank-wrangler list | head`
+        sys.stderr.close()
+        sys.exit(1)
 
 
 @cli.command(name='report')
-def report_cmd():
+@click.option('--max-points', type=click.IntRange(3), default=report.MAX_POINTS,
+              show_default=True,
+              help='Dates the Balance chart plots before zooming in.')
+def report_cmd(max_points):
     transactions, accounts = _list_transactions()
-    report.generate(os.getcwd(), transactions, accounts)
+    report.generate(os.getcwd(), transactions, accounts, max_points)
+
+
+@cli.command(name='watch')
+def watch_cmd():
+    """Regenerate the report whenever data files or rules.py change"""
+    _assert_initialized()
+    root = os.getcwd()
+    watch(root, _bank_names(root), _data_key(root))
+
+
+@cli.command(name='balance')
+@click.option('--as-of', callback=_parse_date,
+              help='Balance at the end of this day (default: latest).')
+@click.argument('accounts', nargs=-1)
+def balance_cmd(as_of, accounts):
+    """Show account balances"""
+    transactions, known = _list_transactions()
+    for account in accounts:
+        if account not in known:
+            print('unknown account ' + account, file=sys.stderr)
+            sys.exit(1)
+    with trace.span('balance index') as s:
+        index = BalanceIndex(transactions)
+        s['rows'] = len(transactions)
+    rows = [(account, index.balance(account, as_of))
+            for account in (accounts or known)]
+    print(tabulate(rows, headers=['account', 'balance']))
+
+
+@cli.command(name='query')
+@click.option('--since', callback=_parse_date, help='First date to include.')
+@click.option('--until', callback=_parse_date, help='Last date to include.')
+@click.option('--account', 'accounts', multiple=True,
+              help='Source or destination account (repeatable).')
+@click.option('--category', 'categories', multiple=True,
+              help='Category (repeatable).')
+@click.option('--min-amount', callback=_parse_amount,
+              help='Smallest amount to include.')
+@click.option('--max-amount', callback=_parse_amount,
+              help='Largest amount to include.')
+@click.option('--description',
+              help='Substring, or SQL LIKE pattern, of the description.')
+@click.option('--group-by', multiple=True, type=click.Choice(list(GROUPINGS)),
+              help='Aggregate count and total by this column (repeatable).')
+@click.option('--refresh', is_flag=True,
+              help='Sync the index even if its inputs have not changed.')
+def query_cmd(refresh, **filters):
+    """Query the transaction index"""
+    database = _database(refresh)
+    with trace.span('database query') as s:
+        columns, rows = database.query(**filters)
+        s['rows'] = len(rows)
+    print(tabulate(rows, headers=columns))
+
+
+@cli.command(name='export')
+@click.argument('path', type=click.Path(dir_okay=False))
+def export_cmd(path):
+    """Export transactions to a columnar file (see bank_wrangler.columnar)"""
+    transactions, _ = _list_transactions()
+    with trace.span('columnar export') as s:
+        s['rows'] = columnar.write(path, transactions)
+    print(f'wrote {s["rows"]} transactions to {path}')
+
+
+@cli.command(name='suggest-categories')
+@click.option('--top', default=3, show_default=True,
+              help='Suggestions to show per description.')
+@click.option('--accept', type=click.FloatRange(0, 1),
+              help='Write the best suggestion into rules.py when its '
+                   'confidence is at least this.')
+def suggest_categories(top, accept):
+    """Suggest categories for uncategorized transactions"""
+    transactions, _ = _list_transactions()
+    with trace.span('suggest categories') as s:
+        suggestions = suggest.suggest_all(transactions, top)
+        s['rows'] = len(suggestions)
+    rows = [(description, count, ', '.join(f'{category} ({confidence:.2f})'
+                                           for category, confidence in best))
+            for description, count, best in suggestions]
+    print(tabulate(rows, headers=['description', 'count', 'suggestions']))
+    if accept is not None:
+        accepted = {description: best[0][0]
+                    for description, _, best in suggestions
+                    if best and best[0][1] >= accept}
+        if accepted:
+            Rules(os.getcwd()).add_categories(accepted)
+        print(f'wrote {len(accepted)} categories to rules.py')
+
+
+@cli.command(name='migrate-rules')
+def migrate_rules():
+    """Update categories accepted into rules.py by older versions"""
+    _assert_initialized()
+    count = Rules(os.getcwd()).migrate()
+    print(f'updated {count} accepted category blocks in rules.py')
+
+
+@cli.command(name='recurring')
+@click.option('--as-of', callback=_parse_date,
+              help='Date to check for late payments (default: today).')
+@click.option('--min-count', type=click.IntRange(2), default=3, show_default=True,
+              help='Fewest payments that make a series.')
+def recurring_cmd(as_of, min_count):
+    """List recurring payments and subscriptions"""
+    transactions, _ = _list_transactions()
+    with trace.span('recurring') as s:
+        found = recurring.detect(transactions, as_of, min_count)
+        s['rows'] = len(found)
+    rows = []
+    for r in found:
+        notes = []
+        if r.overdue:
+            notes.append('overdue')
+        if r.missed:
+            notes.append(f'{r.missed} missed')
+        if r.amount_changed:
+            notes.append(f'amount changed to {r.last_amount}')
+        rows.append((r.description, r.source, r.to, r.period, r.count,
+                     r.typical, r.last_date, r.next_date, ', '.join(notes)))
+    print(tabulate(rows, headers=['description', 'source', 'to', 'period', 'count',
+                                  'typical', 'last', 'next', 'notes']))
+
+
+@cli.group(name='budget', invoke_without_command=True)
+@click.option('--month', callback=_parse_month,
+              help='Month to check, e.g. 2017/01 (default: this month).')
+@click.option('--account', 'accounts', multiple=True,
+              help='Only count spending from this account (repeatable).')
+@click.option('--threshold', type=click.FloatRange(0), default=1.0,
+              show_default=True,
+              help='Share of a budget that counts as crossing it.')
+@click.option('--refresh', is_flag=True,
+              help='Sync the index even if its inputs have not changed.')
+@click.pass_context
+def budget_cmd(ctx, month, accounts, threshold, refresh):
+    """
+    Show spending against monthly budgets, net of refunds. Exits with
+    status 1 if a budget's threshold is crossed.
+    """
+    if ctx.invoked_subcommand is not None:
+        return
+    _assert_initialized()
+    root = os.getcwd()
+    if month is None:
+        month = datetime.date.today().strftime('%Y/%m')
+    database = _database(refresh)
+    with trace.span('budget status') as s:
+        totals = database.monthly(month, accounts)
+        spent = {category: out - back for category, (_, out, back) in totals.items()}
+        statuses = budget.status(budget.Budgets(root).for_month(month), spent,
+                                 threshold)
+        s['rows'] = len(statuses)
+    rows = [(st.category, st.budget, st.spent, st.remaining, f'{st.used:.0%}',
+             'crossed' if st.crossed else '')
+            for st in statuses]
+    print(f'budgets for {month}')
+    print(tabulate(rows, headers=['category', 'budget', 'spent', 'remaining',
+                                  'used', '']))
+    if any(st.crossed for st in statuses):
+        sys.exit(1)
+
+
+@budget_cmd.command(name='set')
+@click.argument('category')
+@click.argument('amount')
+@click.option('--month', callback=_parse_month,
+              help='Only set the budget of this month, e.g. 2017/12.')
+def budget_set(category, amount, month):
+    """Set a category's monthly budget, or remove it with `none`"""
+    _assert_initialized()
+    if amount.lower() == 'none':
+        value = None
+    else:
+        try:
+            value = Decimal(amount)
+        except InvalidOperation:
+            value = None
+        # a NaN budget would make every later `budget` run fail
+        if value is None or not value.is_finite() or value < 0:
+            print(f'fatal: not an amount: {amount}', file=sys.stderr)
+            sys.exit(1)
+    budget.Budgets(os.getcwd()).set(category, value, month)
+
+
+@cli.command(name='encrypt-data')
+@click.option('--show-key', is_flag=True,
+              help=f'Print the data key, for setting {datafile.KEY_ENV}.')
+def encrypt_data(show_key):
+    """Encrypt the .data files, and those fetched from now on"""
+    _assert_initialized()
+    root = os.getcwd()
+    passphrase = _promptpass()
+    # fails on a mistyped passphrase before the key is locked with it
+    Vault(root).get_all(passphrase)
+    store = datafile.KeyStore(root)
+    key = store.get(passphrase) if store.exists() else store.create(passphrase)
+    encrypted = 0
+    with snapshot.writer(root) as w:
+        for name in Vault(root).keys():
+            path = w.path(name + '.data')
+            if os.path.exists(path) and not datafile.is_encrypted(path):
+                datafile.encrypt_file(path, w.new_path(name + '.data'), key)
+                encrypted += 1
+    print(f'encrypted {encrypted} data files')
+    if show_key:
+        print(f'{datafile.KEY_ENV}={key.hex()}')
+
+
+def _batch_one(root, passphrase, do_fetch, do_report, pool, verify):
+    configs = Vault(root).get_all(passphrase)
+    data_key = _data_key(root, passphrase, prefer_env=False)
+    if do_fetch:
+        for name, cfg in configs.items():
+            print(f'{root}: fetching {name}... ')
+            BankInstance(root, name, cfg.bank, data_key).fetch(cfg.fields)
+    banks = {key: cfg.bank for key, cfg in configs.items()}
+    with snapshot.reader(root) as s:
+        inputs = _inputs(root, s, banks)
+    transactions, accounts = _pipeline(root, banks, pool=pool, data_key=data_key,
+                                       verify=verify)
+    if do_fetch:
+        _sync_database(root, transactions, inputs)
+    if do_report:
+        report.generate(root, transactions, accounts)
+
+
+@cli.command(name='batch')
+@click.argument('roots', nargs=-1, type=click.Path(file_okay=False))
+@click.option('--manifest', type=click.File(),
+              help='File listing one root directory per line.')
+@click.option('--fetch/--no-fetch', 'do_fetch', default=True, show_default=True)
+@click.option('--report/--no-report', 'do_report', default=True, show_default=True)
+def batch(roots, manifest, do_fetch, do_report):
+    """Fetch and report several roots in one process"""
+    roots = list(roots)
+    if manifest is not None:
+        roots += [line.strip() for line in manifest
+                  if line.strip() and not line.startswith('#')]
+    for root in roots:
+        if not _initialized(root):
+            print(f'fatal: {root} is not initialized with `bank_wrangler init`',
+                  file=sys.stderr)
+            sys.exit(1)
+    # ask for everything up front so the rest of the run is unattended
+    passphrases = {root: getpass(f'master passphrase for {root}: ')
+                   for root in roots}
+    statuses = []
+    with ProcessPoolExecutor() as pool:
+        for root in roots:
+            start = time.perf_counter()
+            try:
+                with trace.span('batch root', root=root):
+                    _batch_one(root, passphrases[root], do_fetch, do_report, pool,
+                               _verify_stitch())
+                status = 'ok'
+            except Exception as e:
+                status = f'failed: {type(e).__name__}: {e}'
+            statuses.append((root, status, round(time.perf_counter() - start, 1)))
+    print(tabulate(statuses, headers=['root', 'status', 'seconds']))
+    if any(status != 'ok' for _, status, _ in statuses):
+        sys.exit(1)
 
 
 if __name__ == '__main__':
@@ -1,8 +1,13 @@
 from atomicwrites import atomic_write
 from bank_wrangler.bank import fidelity, fidelity_visa, venmo
 from bank_wrangler.config import Config
+from bank_wrangler.rules import Rules
+from bank_wrangler import datafile, schema, snapshot, trace
 from getpass import getpass
+import json
 import os
+import tempfile
+import time
 
 
 _all_banks = [fidelity, fidelity_visa, venmo]
@@ -29,18 +34,157 @@ def generate_config():
     return Config(selected.name(), fields)
 
 
+def _metadata_path(root, key):
+    return os.path.join(root, key + '.meta.json')
+
+
+def _read_metadata(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def recorded_bank(root, key):
+    """
+    The bank type of the config `key` as recorded in its plaintext
+    metadata, or None if it was never recorded.
+    """
+    return _read_metadata(_metadata_path(root, key)).get('bank')
+
+
 class BankInstance:
-    """An instance of a bank type."""
+    """
+    An instance of a bank type. Parsing needs only the bank name; the
+    config fields with the credentials are passed to fetch. Fetched data
+    is compressed, and if data_key is given, encrypted with it (see
+    bank_wrangler.datafile).
+    """
+
+    def __init__(self, root, key, bank_name, data_key=None):
+        self.root = root
+        self.key = key
+        self.data_key = data_key
+        self.name = key + '.data'
+        self.meta_path = _metadata_path(root, key)
+        self.bank =  next(b for b in _all_banks if b.name() == bank_name)
+
+    @property
+    def path(self):
+        """The data file in the current snapshot (see bank_wrangler.snapshot)."""
+        return snapshot.current(self.root).path(self.name)
+
+    def fetch(self, fields):
+        """
+        Fetch into a staging file, then publish it as a new snapshot, so the
+        writer lock is only held for the publishing.
+        """
+        start = time.time()
+        fd, staging = tempfile.mkstemp(prefix=f'.{self.name}.', dir=self.root)
+        try:
+            with open(fd, 'wb') as f:
+                with datafile.text_writer(f, self.data_key,
+                                          compression=datafile.COMPRESSION) as writer:
+                    self.bank.fetch(fields, writer)
+                f.flush()
+                os.fsync(f.fileno())
+            size = os.path.getsize(staging)
+            with snapshot.writer(self.root) as w:
+                os.replace(staging, w.new_path(self.name))
+        except BaseException:
+            if os.path.exists(staging):
+                os.remove(staging)
+            raise
+        self._update_metadata(bank=self.bank.name(),
+                              last_success=start,
+                              duration=time.time() - start,
+                              bytes=size)
+
+    def metadata(self):
+        """
+        What is known about this instance: a dict with the keys bank (the
+        bank type), and from the last successful fetch last_success (epoch
+        seconds), duration (seconds) and bytes. Keys never recorded are
+        missing.
+        """
+        return _read_metadata(self.meta_path)
+
+    def record_bank(self):
+        """Record the bank type so it can be parsed without the vault."""
+        if self.metadata().get('bank') != self.bank.name():
+            self._update_metadata(bank=self.bank.name())
 
-    def __init__(self, root, key, config):
-        self.path = os.path.join(root, key + '.data')
-        self.bank =  next(b for b in _all_banks if b.name() == config.bank)
-        self.config = config
+    def _update_metadata(self, **fields):
+        metadata = self.metadata()
+        metadata.update(fields)
+        with atomic_write(self.meta_path, mode='w', overwrite=True) as f:
+            json.dump(metadata, f, indent=2, sort_keys=True)
 
-    def fetch(self):
+    def age(self, now=None):
+        """Seconds since the last successful fetch, or None if unknown."""
+        last = self.metadata().get('last_success')
+        if last is None or not os.path.exists(self.path):
+            return None
+        return (time.time() if now is None else now) - last
+
+    def transactions_by_account(self, path=None):
+        """
+        Parse the data file at path, by default the one in the current
+        snapshot. Readers that must not race a fetch get path from a
+        snapshot.reader they hold.
+        """
+        with trace.span('transactions_by_account', key=self.key) as s:
+            with datafile.open_text(path or self.path, self.data_key) as f:
+                result = self.bank.transactions_by_account(f)
+            s['rows'] = sum(map(len, result.values()))
+        return result
+
+
+def parse(root, key, bank_name, tracing=False, data_key=None, path=None):
+    """
+    Parse the data file of one bank instance, at path if given, and apply
+    the pre_stitch rule.
+
+    This is meant to run in a worker process, so it returns plain data:
+    a dict of account name to list of schema.to_row rows, and the trace
+    events recorded in this call if tracing.
+    """
+    if tracing:
+        trace.enable()
+    r = Rules(root).get_module()
+    instance = BankInstance(root, key, bank_name, data_key)
+    result = {}
+    for account, ts in instance.transactions_by_account(path).items():
+        with trace.span('pre_stitch', key=key, account=account) as s:
+            result[account] = [schema.to_row(r.pre_stitch(t)) for t in ts]
+            s['rows'] = len(result[account])
+    return result, trace.events() if tracing else []
+
+
+class FetchCheckpoint:
+    """
+    The bank instances fetched so far by an unfinished fetch-all run,
+    persisted in <root>/fetch-checkpoint.json so a rerun can resume.
+    """
+
+    def __init__(self, root):
+        self.path = os.path.join(root, 'fetch-checkpoint.json')
+
+    def done(self):
+        try:
+            with open(self.path) as f:
+                return set(json.load(f)['done'])
+        except (FileNotFoundError, ValueError, KeyError):
+            return set()
+
+    def add(self, key):
+        done = sorted(self.done() | {key})
         with atomic_write(self.path, mode='w', overwrite=True) as f:
-            self.bank.fetch(self.config.fields, f)
+            json.dump({'done': done}, f)
 
-    def transactions_by_account(self):
-        with open(self.path) as f:
-            return self.bank.transactions_by_account(f)
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,86 @@
+"""
+Monthly spending budgets per category, kept in <root>/budgets.json as
+
+    {category: {"default": amount, "YYYY/MM": amount, ...}}
+
+where a month's entry overrides the default for that month. Spending is
+read from the monthly totals of the database (see bank_wrangler.database),
+so checking it needs no parsing.
+"""
+
+
+from atomicwrites import atomic_write
+from decimal import Decimal
+from typing import NamedTuple
+import json
+import os
+
+
+DEFAULT = 'default'
+
+
+class Status(NamedTuple):
+    category: str
+    budget: Decimal
+    spent: Decimal
+    remaining: Decimal
+    used: float        # spent / budget
+    crossed: bool      # used reached the threshold
+
+
+class Budgets:
+    def __init__(self, root):
+        self.path = os.path.join(root, 'budgets.json')
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def get_all(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def set(self, category, amount, month=None):
+        """
+        Budget amount for category each month, or only in month (YYYY/MM)
+        if given. An amount of None removes the budget.
+        """
+        budgets = self.get_all()
+        entry = budgets.setdefault(category, {})
+        if amount is None:
+            entry.pop(month or DEFAULT, None)
+        else:
+            entry[month or DEFAULT] = str(amount)
+        if not entry:
+            del budgets[category]
+        with atomic_write(self.path, mode='w', overwrite=True) as f:
+            json.dump(budgets, f, indent=2, sort_keys=True)
+
+    def for_month(self, month):
+        """{category: budget} in effect in month."""
+        result = {}
+        for category, entry in self.get_all().items():
+            amount = entry.get(month, entry.get(DEFAULT))
+            if amount is not None:
+                result[category] = Decimal(amount)
+        return result
+
+
+def status(budgets, spent, threshold=1.0):
+    """
+    The Status of each category in budgets ({category: budget}) given
+    spent ({category: amount}), sorted by category. A category is crossed
+    once it has spent threshold times its budget.
+    """
+    result = []
+    for category, budget in sorted(budgets.items()):
+        amount = spent.get(category, Decimal('0.00'))
+        if budget > 0:
+            used = float(amount / budget)
+        else:
+            used = float('inf') if amount > 0 else 0.0
+        result.append(Status(category, budget, amount, budget - amount, used,
+                             used >= threshold and amount > 0))
+    return result
@@ -0,0 +1,200 @@
+"""
+A memory-mappable columnar file of transactions for external analysis.
+
+Layout, all integers little-endian:
+
+    magic        8 bytes   b'BWCOL01\\n'
+    header_len   uint32
+    header       header_len bytes of UTF-8 JSON
+    padding      to a multiple of 8 bytes; the data section starts here
+    columns      each block starts on a multiple of 8 bytes
+
+The header looks like
+
+    {"rows": 3, "columns": [
+        {"name": "date", "kind": "date", "dtype": "<i8", "offset": 0},
+        {"name": "amount", "kind": "cents", "dtype": "<i8", "offset": 24},
+        {"name": "source", "kind": "dictionary", "size": 2,
+         "codes": {"dtype": "<u4", "offset": 48},
+         "offsets": {"dtype": "<u8", "offset": 64},
+         "data": {"offset": 88, "length": 15}},
+        ...]}
+
+where every offset is relative to the start of the data section.
+"date" columns hold days since 1970-01-01, so numpy can view them as
+datetime64[D]. "cents" columns hold amounts in hundredths, with fractions
+of a cent rounded as the database index rounds them (see schema.cents).
+A "dictionary" column holds one code per row into a table of `size`
+distinct strings. String i is data[offsets[i]:offsets[i + 1]] in UTF-8.
+
+`load` maps the file and returns zero-copy numpy views, so opening even a
+very large export costs nothing up front. numpy is only needed for `load`.
+"""
+
+
+from array import array
+from collections import namedtuple
+from collections.abc import Sequence
+from operator import attrgetter
+import datetime
+import json
+import mmap
+import struct
+import sys
+from bank_wrangler import schema
+
+
+MAGIC = b'BWCOL01\n'
+_EPOCH = datetime.date(1970, 1, 1).toordinal()
+
+# A dictionary-encoded string column: codes[i] indexes into dictionary.
+Strings = namedtuple('Strings', ['codes', 'dictionary'])
+
+
+class Dictionary(Sequence):
+    """The strings of a dictionary column, decoded as they are looked up."""
+
+    def __init__(self, offsets, data):
+        self.offsets = offsets
+        self.data = data
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError('dictionary index out of range')
+        start, end = int(self.offsets[i]), int(self.offsets[i + 1])
+        return str(self.data[start:end], 'utf-8')
+
+
+def _days(date):
+    return datetime.date(*date.value).toordinal() - _EPOCH
+
+
+def _pad(n):
+    return -n % 8
+
+
+class _Blocks:
+    """Accumulates 8-byte aligned blocks of the data section."""
+
+    def __init__(self):
+        self.parts = []
+        self.size = 0
+
+    def add(self, data):
+        if isinstance(data, array):
+            if sys.byteorder == 'big':
+                data = array(data.typecode, data)
+                data.byteswap()
+            data = data.tobytes()
+        offset = self.size
+        self.parts.append(data)
+        self.parts.append(b'\0' * _pad(len(data)))
+        self.size += len(data) + _pad(len(data))
+        return offset
+
+
+def _dictionary_column(blocks, name, values):
+    codes = array('I')
+    table = {}
+    for value in values:
+        codes.append(table.setdefault(value, len(table)))
+    offsets = array('Q', [0])
+    data = bytearray()
+    for value in table:
+        data += value.encode()
+        offsets.append(len(data))
+    return {
+        'name': name,
+        'kind': 'dictionary',
+        'size': len(table),
+        'codes': {'dtype': '<u4', 'offset': blocks.add(codes)},
+        'offsets': {'dtype': '<u8', 'offset': blocks.add(offsets)},
+        'data': {'offset': blocks.add(bytes(data)), 'length': len(data)},
+    }
+
+
+def write(path, transactions):
+    """Write transactions to path. Returns the number of rows written."""
+    transactions = list(transactions)
+    blocks = _Blocks()
+    columns = [
+        {'name': 'date', 'kind': 'date', 'dtype': '<i8',
+         'offset': blocks.add(array('q', (_days(t.date) for t in transactions)))},
+        {'name': 'amount', 'kind': 'cents', 'dtype': '<i8',
+         'offset': blocks.add(array('q', (schema.cents(t.amount)
+                                          for t in transactions)))},
+    ]
+    for name in ['source', 'to', 'description', 'category']:
+        get = schema.describe if name == 'description' else attrgetter(name)
+        columns.append(_dictionary_column(
+            blocks, name, (get(t) for t in transactions)))
+    header = json.dumps({'rows': len(transactions), 'columns': columns}).encode()
+    with open(path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<I', len(header)))
+        f.write(header)
+        f.write(b'\0' * _pad(len(MAGIC) + 4 + len(header)))
+        for part in blocks.parts:
+            f.write(part)
+    return len(transactions)
+
+
+def _read_header(buf):
+    if buf[:len(MAGIC)] != MAGIC:
+        raise ValueError('not a bank_wrangler columnar file')
+    (length,) = struct.unpack_from('<I', buf, len(MAGIC))
+    start = len(MAGIC) + 4
+    header = json.loads(bytes(buf[start:start + length]).decode())
+    return header, start + length + _pad(start + length)
+
+
+def read_header(path):
+    """The JSON header of the file at path."""
+    with open(path, 'rb') as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+        return _read_header(buf)[0]
+
+
+def load(path):
+    """
+    Map the file at path and return a dict of column name to numpy array,
+    or to Strings for dictionary-encoded columns. Dates come back as
+    datetime64[D] and amounts as int64 cents. The arrays are read-only views
+    of the mapping, and a Strings' dictionary decodes each string from it
+    only when looked up.
+    """
+    import numpy
+
+    with open(path, 'rb') as f:
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    header, base = _read_header(buf)
+    rows = header['rows']
+
+    def view(dtype, offset, count):
+        return numpy.frombuffer(buf, dtype=dtype, count=count,
+                                offset=base + offset)
+
+    result = {}
+    for column in header['columns']:
+        if column['kind'] == 'date':
+            result[column['name']] = view(column['dtype'], column['offset'],
+                                          rows).view('datetime64[D]')
+        elif column['kind'] == 'cents':
+            result[column['name']] = view(column['dtype'], column['offset'], rows)
+        else:
+            assert column['kind'] == 'dictionary'
+            offsets = view(column['offsets']['dtype'],
+                           column['offsets']['offset'], column['size'] + 1)
+            start = base + column['data']['offset']
+            data = memoryview(buf)[start:start + column['data']['length']]
+            dictionary = Dictionary(offsets, data)
+            codes = view(column['codes']['dtype'], column['codes']['offset'], rows)
+            result[column['name']] = Strings(codes, dictionary)
+    return result
@@ -3,11 +3,11 @@ Read/write bank configurations into an encrypted vault.
 """
 
 
-from atomicwrites import atomic_write
 from collections import namedtuple
 import os
 import json
 import rncryptor
+from bank_wrangler import snapshot, trace
 
 
 # Each config is a bank name and a list of ConfigFields.
@@ -28,53 +28,63 @@ def _decrypt(encrypted, passphrase):
 
 
 class Vault:
+    """
+    The vault and vault-keys files, read and replaced together through
+    bank_wrangler.snapshot.
+    """
+
     def __init__(self, root):
-        self.keys_path = os.path.join(root, 'vault-keys')
-        self.store = os.path.join(root, 'vault')
+        self.root = root
 
     def exists(self):
-        return os.path.exists(self.keys_path) and os.path.exists(self.store)
+        current = snapshot.current(self.root)
+        return (os.path.exists(current.path('vault-keys')) and
+                os.path.exists(current.path('vault')))
 
     def write_empty(self, passphrase):
-        with atomic_write(self.keys_path, mode='w', overwrite=False) as f:
-            f.truncate()
-        with atomic_write(self.store, mode='wb', overwrite=False) as f:
-            f.write(_encrypt({}, passphrase))
+        with snapshot.writer(self.root) as w:
+            if os.path.exists(w.path('vault')):
+                raise FileExistsError(w.path('vault'))
+            self._write(w, {}, passphrase)
 
     def keys(self):
-        with open(self.keys_path) as f:
-            return [line.strip() for line in f if line.strip() != '']
-
-    def _read(self, passphrase):
-        with open(self.store, 'rb') as f:
-            d = f.read()
-        return _decrypt(d, passphrase)
-
-    def _write(self, data, passphrase):
+        with snapshot.reader(self.root) as s:
+            with open(s.path('vault-keys')) as f:
+                return [line.strip() for line in f if line.strip() != '']
+
+    def _read(self, path, passphrase):
+        with trace.span('vault read/decrypt') as s:
+            with open(path, 'rb') as f:
+                d = f.read()
+            data = _decrypt(d, passphrase)
+            s['rows'] = len(data)
+        return data
+
+    def _write(self, writer, data, passphrase):
         new_encrypted = _encrypt(data, passphrase)
-        with atomic_write(self.store, mode='wb', overwrite=True) as f:
+        with open(writer.new_path('vault'), 'wb') as f:
             f.write(new_encrypted)
-        with atomic_write(self.keys_path, mode='w', overwrite=True) as f:
-            text = '\n'.join(sorted(data.keys()))
-            if len(text) == 0:
-                f.truncate()
-            else:
-                f.write(text)
+        with open(writer.new_path('vault-keys'), 'w') as f:
+            f.write('\n'.join(sorted(data.keys())))
 
     def get_all(self, passphrase):
+        with snapshot.reader(self.root) as s:
+            data = self._read(s.path('vault'), passphrase)
         # restores namedtuples that were lost during serialization
         return {
             key: Config(bank, [ConfigField(*line) for line in fields])
             for key, (bank, fields)
-            in self._read(passphrase).items()
+            in data.items()
         }
 
     def put(self, key, config, passphrase):
-        data = self._read(passphrase)
-        data[key] = config
-        self._write(data, passphrase)
+        with snapshot.writer(self.root) as w:
+            data = self._read(w.path('vault'), passphrase)
+            data[key] = config
+            self._write(w, data, passphrase)
 
     def delete(self, key, passphrase):
-        data = self._read(passphrase)
-        del data[key]
-        self._write(data, passphrase)
+        with snapshot.writer(self.root) as w:
+            data = self._read(w.path('vault'), passphrase)
+            del data[key]
+            self._write(w, data, passphrase)
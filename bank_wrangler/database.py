@@ -0,0 +1,262 @@
+"""
+A local SQLite index of the stitched, rule-applied transactions.
+
+The index is brought up to date with `Database.sync`, which diffs the new
+transactions against the stored ones as multisets and only inserts and
+deletes the rows that changed.
+
+Fetches sync the index as soon as they finish, so queries find it up to
+date. sync also records what the transactions were computed from, so that
+a command reading the index can tell when it went stale some other way,
+e.g. an edit to rules.py, and sync it first.
+
+The monthly table holds, per month, category and account, the money that
+left the account for outside (spent) and came in from outside (received).
+Transfers between two accounts count as neither. sync applies the rows it
+inserts and deletes to these totals rather than recomputing them.
+"""
+
+
+from collections import Counter
+from contextlib import closing
+from decimal import Decimal
+import json
+import os
+import sqlite3
+from bank_wrangler import schema
+
+
+_schema = """
+CREATE TABLE IF NOT EXISTS transactions (
+    id INTEGER PRIMARY KEY,
+    rowkey TEXT NOT NULL,
+    source TEXT NOT NULL,
+    "to" TEXT NOT NULL,
+    date TEXT NOT NULL,
+    description TEXT NOT NULL,
+    amount TEXT NOT NULL,
+    cents INTEGER NOT NULL,
+    category TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS transactions_rowkey ON transactions (rowkey);
+CREATE INDEX IF NOT EXISTS transactions_date ON transactions (date);
+CREATE INDEX IF NOT EXISTS transactions_source ON transactions (source, date);
+CREATE INDEX IF NOT EXISTS transactions_to ON transactions ("to", date);
+CREATE INDEX IF NOT EXISTS transactions_category ON transactions (category, date);
+CREATE INDEX IF NOT EXISTS transactions_cents ON transactions (cents);
+CREATE TABLE IF NOT EXISTS monthly (
+    month TEXT NOT NULL,
+    category TEXT NOT NULL,
+    account TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    spent INTEGER NOT NULL,
+    received INTEGER NOT NULL,
+    PRIMARY KEY (month, category, account)
+);
+CREATE TABLE IF NOT EXISTS state (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# Bumped when a table is added that has to be filled from the transactions.
+_VERSION = 1
+
+_backfill_monthly = """
+DELETE FROM monthly;
+INSERT INTO monthly
+    SELECT substr(date, 1, 7), category, account, COUNT(*),
+           SUM(CASE WHEN spent THEN cents ELSE 0 END),
+           SUM(CASE WHEN spent THEN 0 ELSE cents END)
+    FROM (SELECT date, category, cents, source AS account, 1 AS spent
+          FROM transactions WHERE source != '' AND "to" = ''
+          UNION ALL
+          SELECT date, category, cents, "to", 0
+          FROM transactions WHERE source = '' AND "to" != '')
+    GROUP BY 1, 2, 3;
+"""
+
+
+# group-by name -> SQL expression
+GROUPINGS = {
+    'source': 'source',
+    'to': '"to"',
+    'category': 'category',
+    'date': 'date',
+    'month': 'substr(date, 1, 7)',
+    'year': 'substr(date, 1, 4)',
+}
+
+
+def _add_monthly(deltas, source, to, date, cents, category, n):
+    """Add n transactions to deltas, {(month, category, account): counts}."""
+    if source and not to:
+        account, spent, received = source, cents, 0
+    elif to and not source:
+        account, spent, received = to, 0, cents
+    else:
+        return
+    delta = deltas.setdefault((date[:7], category, account), [0, 0, 0])
+    delta[0] += n
+    delta[1] += n * spent
+    delta[2] += n * received
+
+
+def _row(t):
+    fields = (t.source, t.to, str(t.date), schema.describe(t), str(t.amount),
+              t.category)
+    return ((json.dumps(fields + (t.meta,)),) + fields[:5] +
+            (schema.cents(t.amount), t.category))
+
+
+class Database:
+    def __init__(self, root):
+        self.path = os.path.join(root, 'transactions.sqlite3')
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path)
+        conn.executescript(_schema)
+        (version,) = conn.execute('PRAGMA user_version').fetchone()
+        if version < _VERSION:
+            # an index from before the monthly table
+            with conn:
+                conn.executescript(_backfill_monthly)
+                conn.execute(f'PRAGMA user_version = {_VERSION}')
+        return conn
+
+    def inputs(self):
+        """The inputs recorded by the last sync, or None."""
+        if not self.exists():
+            return None
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT value FROM state WHERE key = 'inputs'").fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def sync(self, transactions, inputs=None):
+        """
+        Make the stored transactions equal to `transactions`, touching only
+        the rows that differ, and record inputs, a JSON value describing
+        what they were computed from. Returns (inserted, deleted) row counts.
+        """
+        wanted = {}
+        for t in transactions:
+            row = _row(t)
+            if row[0] in wanted:
+                wanted[row[0]][1] += 1
+            else:
+                wanted[row[0]] = [row, 1]
+        with closing(self._connect()) as conn, conn:
+            stored = Counter(dict(conn.execute(
+                'SELECT rowkey, COUNT(*) FROM transactions GROUP BY rowkey')))
+            deleted = 0
+            deltas = {}
+            for rowkey, count in stored.items():
+                extra = count - wanted.get(rowkey, (None, 0))[1]
+                if extra > 0:
+                    # rows with the same rowkey are identical
+                    old = conn.execute(
+                        'SELECT source, "to", date, cents, category '
+                        'FROM transactions WHERE rowkey = ? LIMIT 1',
+                        (rowkey,)).fetchone()
+                    _add_monthly(deltas, *old, -extra)
+                    conn.execute(
+                        'DELETE FROM transactions WHERE id IN '
+                        '(SELECT id FROM transactions WHERE rowkey = ? LIMIT ?)',
+                        (rowkey, extra))
+                    deleted += extra
+            new_rows = []
+            for rowkey, (row, count) in wanted.items():
+                missing = count - stored[rowkey]
+                if missing > 0:
+                    new_rows.extend([row] * missing)
+                    _, source, to, date, _, _, cents, category = row
+                    _add_monthly(deltas, source, to, date, cents, category, missing)
+            conn.executemany(
+                'INSERT INTO transactions (rowkey, source, "to", date, '
+                'description, amount, cents, category) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)', new_rows)
+            conn.executemany(
+                'INSERT INTO monthly VALUES (?, ?, ?, ?, ?, ?) '
+                'ON CONFLICT (month, category, account) DO UPDATE SET '
+                'count = count + excluded.count, '
+                'spent = spent + excluded.spent, '
+                'received = received + excluded.received',
+                [key + tuple(delta) for key, delta in deltas.items()
+                 if any(delta)])
+            conn.execute('DELETE FROM monthly WHERE count = 0')
+            conn.execute("INSERT OR REPLACE INTO state VALUES ('inputs', ?)",
+                         (json.dumps(inputs),))
+        return len(new_rows), deleted
+
+    def monthly(self, month, accounts=()):
+        """
+        The totals of month, a YYYY/MM string, by category, summed over
+        accounts or all accounts: a dict of category to (count, spent,
+        received), the amounts as Decimal.
+        """
+        sql = 'SELECT category, SUM(count), SUM(spent), SUM(received) ' \
+              'FROM monthly WHERE month = ?'
+        params = [month]
+        if accounts:
+            sql += ' AND account IN ({})'.format(', '.join('?' * len(accounts)))
+            params.extend(accounts)
+        with closing(self._connect()) as conn:
+            rows = conn.execute(sql + ' GROUP BY category', params).fetchall()
+        return {category: (count, Decimal(spent).scaleb(-2),
+                           Decimal(received).scaleb(-2))
+                for category, count, spent, received in rows}
+
+    def query(self, since=None, until=None, accounts=(), categories=(),
+              min_amount=None, max_amount=None, description=None,
+              group_by=()):
+        """
+        Select transactions matching every given filter. Without group_by,
+        returns (columns, rows) of transactions ordered by date; with
+        group_by, returns one row per group with a count and a total.
+        """
+        where, params = [], []
+        if since is not None:
+            where.append('date >= ?')
+            params.append(str(since))
+        if until is not None:
+            where.append('date <= ?')
+            params.append(str(until))
+        if accounts:
+            marks = ', '.join('?' * len(accounts))
+            where.append(f'(source IN ({marks}) OR "to" IN ({marks}))')
+            params.extend(accounts)
+            params.extend(accounts)
+        if categories:
+            where.append('category IN ({})'.format(', '.join('?' * len(categories))))
+            params.extend(categories)
+        if min_amount is not None:
+            where.append('cents >= ?')
+            params.append(schema.cents(Decimal(min_amount)))
+        if max_amount is not None:
+            where.append('cents <= ?')
+            params.append(schema.cents(Decimal(max_amount)))
+        if description is not None:
+            if '%' not in description and '_' not in description:
+                description = f'%{description}%'
+            where.append('description LIKE ?')
+            params.append(description)
+        clause = ' WHERE ' + ' AND '.join(where) if where else ''
+
+        if group_by:
+            exprs = [GROUPINGS[g] for g in group_by]
+            sql = 'SELECT {0}, COUNT(*), SUM(cents) FROM transactions{1} ' \
+                  'GROUP BY {0} ORDER BY {0}'.format(', '.join(exprs), clause)
+            columns = list(group_by) + ['count', 'total']
+        else:
+            sql = 'SELECT source, "to", date, description, amount, category ' \
+                  'FROM transactions{} ORDER BY date, id'.format(clause)
+            columns = ['source', 'to', 'date', 'description', 'amount', 'category']
+        with closing(self._connect()) as conn:
+            rows = conn.execute(sql, params).fetchall()
+        if group_by:
+            rows = [row[:-1] + (Decimal(row[-1]).scaleb(-2),) for row in rows]
+        return columns, rows
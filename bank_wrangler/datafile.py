@@ -0,0 +1,327 @@
+"""
+Compression and optional at-rest encryption of <key>.data files.
+
+Fetched text is compressed with zstd if the zstandard module is installed,
+gzip otherwise, then encrypted if there is a data key. Reading detects each
+layer by its magic number, so plain, compressed and encrypted files from
+any version read alike, decompressed and decrypted as they are read.
+
+An encrypted file is the header
+
+    MAGIC, 8 byte random file id, uint32 chunk size
+
+followed by chunks of AES-256-GCM ciphertext, each chunk_size bytes of
+plaintext (the last may be shorter, or empty) followed by its 16 byte tag.
+Chunk i is encrypted under the nonce file id + uint32 i, with the header,
+i and a flag marking the final chunk as associated data, so reordered,
+truncated or extended files fail to authenticate. Chunks are decrypted one
+at a time as the file is read, and since chunk i is at a fixed offset,
+seeking decrypts only the chunk it lands in. Gzip streams can seek too, by
+decompressing again; zstd ones cannot.
+
+Parsers read their input as a stream too: Venmo's JSON one transaction at
+a time (see bank_wrangler.jsonstream), and Fidelity's OFX from a seekable
+reader, or a spooled copy of a zstd one. ofxtools itself decodes the OFX
+body into a single string, so only Fidelity holds its whole plaintext.
+
+The 32 byte data key is kept in <root>/data-key, encrypted with the master
+passphrase like the vault, or given in hex in the environment variable
+BANK_WRANGLER_DATA_KEY so unattended commands need no passphrase.
+"""
+
+
+from atomicwrites import atomic_write
+from Crypto.Cipher import AES
+from Crypto.Random import get_random_bytes
+from bank_wrangler.config import _encrypt, _decrypt
+import gzip
+import io
+import os
+import struct
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+MAGIC = b'BWDATA1\n'
+CHUNK_SIZE = 1 << 18
+KEY_ENV = 'BANK_WRANGLER_DATA_KEY'
+
+_HEADER = struct.Struct('>8s8sI')
+_TAG_SIZE = 16
+
+GZIP_MAGIC = b'\x1f\x8b'
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+# What fetches compress with.
+COMPRESSION = 'gzip' if zstandard is None else 'zstd'
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+
+class KeyStore:
+    def __init__(self, root):
+        self.path = os.path.join(root, 'data-key')
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def create(self, passphrase):
+        key = get_random_bytes(32)
+        with atomic_write(self.path, mode='wb', overwrite=False) as f:
+            f.write(_encrypt({'key': key.hex()}, passphrase))
+        return key
+
+    def get(self, passphrase):
+        with open(self.path, 'rb') as f:
+            return bytes.fromhex(_decrypt(f.read(), passphrase)['key'])
+
+    @staticmethod
+    def from_env():
+        value = os.environ.get(KEY_ENV)
+        return None if value is None else bytes.fromhex(value)
+
+
+def _cipher(key, header, file_id, index, final):
+    cipher = AES.new(key, AES.MODE_GCM,
+                     nonce=file_id + struct.pack('>I', index),
+                     mac_len=_TAG_SIZE)
+    cipher.update(header + struct.pack('>IB', index, final))
+    return cipher
+
+
+class _Encryptor(io.RawIOBase):
+    def __init__(self, fileobj, key, chunk_size):
+        self.fileobj = fileobj
+        self.key = key
+        self.chunk_size = chunk_size
+        self.file_id = get_random_bytes(8)
+        self.header = _HEADER.pack(MAGIC, self.file_id, chunk_size)
+        self.buffer = bytearray()
+        self.index = 0
+        fileobj.write(self.header)
+
+    def writable(self):
+        return True
+
+    def _emit(self, chunk, final):
+        cipher = _cipher(self.key, self.header, self.file_id, self.index, final)
+        ciphertext, tag = cipher.encrypt_and_digest(bytes(chunk))
+        self.fileobj.write(ciphertext + tag)
+        self.index += 1
+
+    def write(self, data):
+        self.buffer += data
+        # keep at least one byte back so the final chunk is never empty
+        # unless the whole file is
+        while len(self.buffer) > self.chunk_size:
+            self._emit(self.buffer[:self.chunk_size], False)
+            del self.buffer[:self.chunk_size]
+        return len(data)
+
+    def close(self):
+        if not self.closed:
+            self._emit(self.buffer, True)
+            self.buffer = bytearray()
+        super().close()
+
+
+class _Decryptor(io.RawIOBase):
+    def __init__(self, fileobj, key):
+        self.fileobj = fileobj
+        self.key = key
+        self.header = fileobj.read(_HEADER.size)
+        magic, self.file_id, self.chunk_size = _HEADER.unpack(self.header)
+        if magic != MAGIC:
+            raise ValueError('not an encrypted data file')
+        self.index = 0
+        self.position = 0
+        self.pending = memoryview(b'')
+        self.next = fileobj.read(self.chunk_size + _TAG_SIZE)
+        self.done = False
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return self.fileobj.seekable()
+
+    def tell(self):
+        return self.position
+
+    def _chunks(self):
+        """The number of chunks and the length of the plaintext."""
+        length = os.fstat(self.fileobj.fileno()).st_size - _HEADER.size
+        chunks = -(-length // (self.chunk_size + _TAG_SIZE))
+        return chunks, length - chunks * _TAG_SIZE
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        """
+        Chunk i starts at a fixed offset in the file, so seeking only
+        decrypts the chunk holding the new position.
+        """
+        chunks, size = self._chunks()
+        if whence == io.SEEK_CUR:
+            offset += self.position
+        elif whence == io.SEEK_END:
+            offset += size
+        if offset < 0:
+            raise ValueError(f'negative seek position {offset}')
+        # past the end, the final chunk is still read to authenticate it
+        self.index = max(0, min(offset // self.chunk_size, chunks - 1))
+        self.fileobj.seek(_HEADER.size +
+                          self.index * (self.chunk_size + _TAG_SIZE))
+        self.next = self.fileobj.read(self.chunk_size + _TAG_SIZE)
+        start = self.index * self.chunk_size
+        self._decrypt_next()
+        self.pending = self.pending[offset - start:]
+        self.position = offset
+        return offset
+
+    def _decrypt_next(self):
+        raw = self.next
+        self.next = self.fileobj.read(self.chunk_size + _TAG_SIZE)
+        final = len(self.next) == 0
+        if len(raw) < _TAG_SIZE:
+            raise ValueError('truncated data file')
+        cipher = _cipher(self.key, self.header, self.file_id, self.index, final)
+        # raises ValueError if the chunk is not authentic
+        self.pending = memoryview(
+            cipher.decrypt_and_verify(raw[:-_TAG_SIZE], raw[-_TAG_SIZE:]))
+        self.index += 1
+        self.done = final
+
+    def readinto(self, b):
+        while not self.pending and not self.done:
+            self._decrypt_next()
+        n = min(len(b), len(self.pending))
+        b[:n] = self.pending[:n]
+        self.pending = self.pending[n:]
+        self.position += n
+        return n
+
+    def close(self):
+        self.fileobj.close()
+        super().close()
+
+
+class _Stack(io.RawIOBase):
+    """
+    Reads or writes through outer, the outermost of a stack of streams each
+    wrapping the next, and closes the streams in closing, outermost first,
+    when it is closed. Compressors and decompressors leave the streams they
+    wrap open, so the stack has to close them.
+    """
+
+    def __init__(self, outer, closing):
+        self.outer = outer
+        self.closing = closing
+
+    def readable(self):
+        return self.outer.readable()
+
+    def writable(self):
+        return self.outer.writable()
+
+    def readinto(self, b):
+        return self.outer.readinto(b)
+
+    def seekable(self):
+        return self.outer.seekable()
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        return self.outer.seek(offset, whence)
+
+    def tell(self):
+        return self.outer.tell()
+
+    def write(self, data):
+        return self.outer.write(data)
+
+    def close(self):
+        if not self.closed:
+            for stream in self.closing:
+                stream.close()
+        super().close()
+
+
+def _compressor(fileobj, compression):
+    if compression == 'gzip':
+        return gzip.GzipFile(fileobj=fileobj, mode='wb',
+                             compresslevel=GZIP_LEVEL, mtime=0)
+    if compression == 'zstd':
+        if zstandard is None:
+            raise ValueError('zstd compression needs the zstandard module')
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(
+            fileobj, closefd=False, write_return_read=True)
+    raise ValueError(f'unknown compression {compression!r}')
+
+
+def _decompressor(fileobj, path):
+    """
+    A decompressing reader of the buffered fileobj, or None if it is not
+    compressed.
+    """
+    head = fileobj.peek(len(ZSTD_MAGIC))
+    if head.startswith(GZIP_MAGIC):
+        return gzip.GzipFile(fileobj=fileobj, mode='rb')
+    if head.startswith(ZSTD_MAGIC):
+        if zstandard is None:
+            raise ValueError(f'{path} is zstd compressed; install zstandard to read it')
+        return zstandard.ZstdDecompressor().stream_reader(fileobj, closefd=False)
+    return None
+
+
+def is_encrypted(path):
+    with open(path, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def open_text(path, key=None):
+    """
+    Open a data file for reading text, decrypting and decompressing it as
+    it is read. Raises ValueError if it is encrypted and key is None.
+    """
+    stream = open(path, 'rb')
+    try:
+        if stream.peek(len(MAGIC)).startswith(MAGIC):
+            if key is None:
+                raise ValueError(f'{path} is encrypted but no data key was given')
+            stream = io.BufferedReader(_Decryptor(stream, key))
+        decompressor = _decompressor(stream, path)
+    except BaseException:
+        stream.close()
+        raise
+    if decompressor is None:
+        return io.TextIOWrapper(stream)
+    return io.TextIOWrapper(io.BufferedReader(
+        _Stack(decompressor, [decompressor, stream])))
+
+
+def text_writer(fileobj, key=None, chunk_size=CHUNK_SIZE, compression=None):
+    """
+    A text file object writing into the binary fileobj, compressed with
+    compression ('gzip' or 'zstd') if given and encrypted with key if
+    given. Closing it finishes the compressed stream and writes the final
+    chunk but leaves fileobj open.
+    """
+    streams = [fileobj]
+    if key is not None:
+        streams.insert(0, io.BufferedWriter(_Encryptor(fileobj, key, chunk_size)))
+    if compression is not None:
+        streams.insert(0, _compressor(streams[0], compression))
+    return io.TextIOWrapper(io.BufferedWriter(_Stack(streams[0], streams[:-1])))
+
+
+def encrypt_file(src_path, dst_path, key):
+    """Encrypt the plain text data file src_path into dst_path."""
+    with open(src_path, 'rb') as src:
+        with atomic_write(dst_path, mode='wb', overwrite=True) as dst:
+            writer = io.BufferedWriter(_Encryptor(dst, key, CHUNK_SIZE))
+            while True:
+                data = src.read(CHUNK_SIZE)
+                if not data:
+                    break
+                writer.write(data)
+            writer.close()
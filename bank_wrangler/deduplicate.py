@@ -0,0 +1,129 @@
+"""
+Merge the same money movement reported by more than one download.
+
+Two situations produce duplicates:
+
+* Overlapping fetch windows of one bank report the same transactions
+  again. `merge_windows` takes the multiset union of the downloads.
+* A transfer between accounts at two banks is reported by both banks.
+  `deduplicate` pairs each such report with one from the other bank.
+
+Both bucket reports by a hash of (source, to, date, amount) and run in
+linear time. They use multiset semantics, so identical charges that really
+happened twice are kept twice.
+"""
+
+
+from collections import Counter, defaultdict, deque
+from contextlib import contextmanager
+import gc
+from decimal import Decimal
+from typing import NamedTuple, Optional
+from bank_wrangler.schema import Date, Meta
+
+
+class Reported(NamedTuple):
+    """A transaction as reported by one bank."""
+    bank: str
+    source: str
+    to: str
+    date: Date
+    description: str
+    amount: Decimal
+    meta: Optional[Meta] = None
+
+
+def _key(reported):
+    return (reported.source, reported.to, reported.date, reported.amount)
+
+
+@contextmanager
+def _gc_paused():
+    """
+    The buckets are acyclic but allocate millions of tracked objects, and
+    the cyclic garbage collector's repeated full scans would otherwise make
+    large inputs superlinear.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def merge_windows(*downloads):
+    """
+    Combine downloads of one bank whose date windows may overlap. A
+    transaction that appears k times in one download and m times in another
+    appears max(k, m) times in the result. Order follows first appearance.
+    """
+    result = []
+    seen = Counter()
+    with _gc_paused():
+        for download in downloads:
+            counts = Counter()
+            for reported in download:
+                key = _key(reported)
+                counts[key] += 1
+                if counts[key] > seen[key]:
+                    seen[key] += 1
+                    result.append(reported)
+    return result
+
+
+def deduplicate(transactions, bank_to_accounts_map):
+    """
+    Merge reports of the same transfer from the banks on either side of it.
+
+    transactions is an iterable of (bank, source, to, date, description,
+    amount[, meta]) tuples, e.g. Reported. bank_to_accounts_map maps each bank to
+    the accounts it holds. A report whose other party is held by another
+    bank is merged with a matching report from that bank; if there is none,
+    the other party is rewritten to 'unmatched: <account>'. Reports whose
+    other party is not held by any bank are kept as they are.
+    """
+    owner = {account: bank
+             for bank, accounts in bank_to_accounts_map.items()
+             for account in accounts}
+    with _gc_paused():
+        return _deduplicate(transactions, owner)
+
+
+def _deduplicate(transactions, owner):
+    result = []
+    # (key, bank to wait for, bank waiting) -> indices into result
+    waiting = defaultdict(deque)
+    for reported in (Reported(*t) for t in transactions):
+        if owner.get(reported.source) == reported.bank:
+            other = reported.to
+        elif owner.get(reported.to) == reported.bank:
+            other = reported.source
+        else:
+            other = None
+        other_bank = owner.get(other)
+        if other_bank is None or other_bank == reported.bank:
+            result.append(reported)
+            continue
+        key = _key(reported)
+        matches = waiting.get((key, reported.bank, other_bank))
+        if matches:
+            i = matches.popleft()
+            match = result[i]
+            result[i] = match._replace(
+                bank='{} + {}'.format(match.bank, reported.bank),
+                description='{} + {}'.format(match.description,
+                                             reported.description))
+            continue
+        waiting[(key, other_bank, reported.bank)].append(len(result))
+        result.append(reported)
+    for (_, other_bank, _), indices in waiting.items():
+        for i in indices:
+            reported = result[i]
+            if owner.get(reported.to) == other_bank:
+                result[i] = reported._replace(to='unmatched: ' + reported.to)
+            else:
+                result[i] = reported._replace(
+                    source='unmatched: ' + reported.source)
+    return result
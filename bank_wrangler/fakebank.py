@@ -0,0 +1,258 @@
+"""
+A local stand-in for the banks, for exercising and benchmarking fetches.
+
+It speaks just enough of each site for the backends:
+
+* POST /ofx answers an OFX InvStmtRq for any account ids (Fidelity).
+* /venmo/... serves a sign-in form, a welcome page and the transaction
+  history JSON (Venmo).
+* /fidelity/... serves the login form, card summary, transaction pages and
+  CSV download that the Fidelity Visa backend clicks through.
+* /static/... serves the images and web fonts every page links to, like
+  the real sites, so browser request blocking has something to block.
+
+Responses hold `rows` generated transactions per account, and each request
+is delayed by `latency` seconds and fails with a 503 with probability
+`fail_rate`. Point the backends at it with `patch_backends`.
+
+    python -m bank_wrangler.fakebank --port 8000 --rows 5000 --latency 0.2
+"""
+
+
+from datetime import datetime, timedelta
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+import argparse
+import json
+import random
+import re
+import threading
+import time
+
+
+# The Venmo account the transaction history belongs to.
+VENMO_USER = 'fake-user'
+
+
+def _history(seed, rows):
+    """rows (datetime, signed Decimal amount, memo) in date order."""
+    rng = random.Random(seed)
+    start = datetime(2015, 1, 1, 12)
+    result = []
+    for i in range(rows):
+        amount = Decimal(rng.randint(-20000, 25000)).scaleb(-2)
+        if amount == 0:
+            amount = Decimal('0.01')
+        date = start + timedelta(days=i * 3 // max(1, rows // 1000 + 1))
+        result.append((date, amount, f'FAKE MERCHANT {rng.randint(1, 500)}'))
+    return result
+
+
+def ofx_response(acctids, rows):
+    statements = []
+    for acctid in acctids:
+        history = _history(acctid, rows)
+        transactions = ''.join(
+            '<INVBANKTRAN><STMTTRN><TRNTYPE>{}</TRNTYPE>'
+            '<DTPOSTED>{:%Y%m%d%H%M%S}</DTPOSTED><TRNAMT>{}</TRNAMT>'
+            '<FITID>{}</FITID><MEMO>{}</MEMO></STMTTRN>'
+            '<SUBACCTFUND>CASH</SUBACCTFUND></INVBANKTRAN>'.format(
+                'CREDIT' if amount > 0 else 'DEBIT', date, amount, i, memo)
+            for i, (date, amount, memo) in enumerate(history))
+        networth = sum((amount for _, amount, _ in history), Decimal('0'))
+        statements.append(
+            '<INVSTMTTRNRS><TRNUID>{acctid}</TRNUID>'
+            '<STATUS><CODE>0</CODE><SEVERITY>INFO</SEVERITY></STATUS>'
+            '<INVSTMTRS><DTASOF>{now:%Y%m%d%H%M%S}</DTASOF><CURDEF>USD</CURDEF>'
+            '<INVACCTFROM><BROKERID>fidelity.com</BROKERID>'
+            '<ACCTID>{acctid}</ACCTID></INVACCTFROM>'
+            '<INVTRANLIST><DTSTART>20150101</DTSTART>'
+            '<DTEND>{now:%Y%m%d}</DTEND>{transactions}</INVTRANLIST>'
+            '<INVBAL><AVAILCASH>0</AVAILCASH><MARGINBALANCE>0</MARGINBALANCE>'
+            '<SHORTBALANCE>0</SHORTBALANCE><BALLIST><BAL><NAME>Networth</NAME>'
+            '<DESC>Net worth</DESC><BALTYPE>DOLLAR</BALTYPE>'
+            '<VALUE>{networth}</VALUE></BAL></BALLIST></INVBAL>'
+            '</INVSTMTRS></INVSTMTTRNRS>'.format(
+                acctid=acctid, now=datetime.now(), transactions=transactions,
+                networth=networth))
+    return (
+        '<?xml version="1.0" encoding="UTF-8" standalone="no"?>\n'
+        '<?OFX OFXHEADER="200" VERSION="220" SECURITY="NONE" '
+        'OLDFILEUID="NONE" NEWFILEUID="NONE"?>\n'
+        '<OFX><SIGNONMSGSRSV1><SONRS>'
+        '<STATUS><CODE>0</CODE><SEVERITY>INFO</SEVERITY></STATUS>'
+        '<DTSERVER>{:%Y%m%d%H%M%S}</DTSERVER><LANGUAGE>ENG</LANGUAGE>'
+        '<FI><ORG>fidelity.com</ORG><FID>7776</FID></FI></SONRS>'
+        '</SIGNONMSGSRSV1><INVSTMTMSGSRSV1>{}</INVSTMTMSGSRSV1></OFX>'
+    ).format(datetime.now(), ''.join(statements))
+
+
+def venmo_history(username, rows):
+    transactions = []
+    balance = Decimal('0')
+    for i, (date, amount, memo) in enumerate(_history(username, rows)):
+        other = f'friend-{i % 50}'
+        actor, target = (other, username) if amount > 0 else (username, other)
+        balance += amount
+        transactions.append({
+            'id': str(1000000 + i),
+            'datetime_created': f'{date:%Y-%m-%dT%H:%M:%S}',
+            'payment': {
+                'actor': {'username': actor},
+                'target': {'user': {'username': target}},
+                'action': 'pay',
+            },
+            'capture': None,
+            'amount': float(abs(amount)),
+            'note': memo,
+            'funding_source': {'name': 'Venmo balance'},
+        })
+    return json.dumps({'data': {
+        'start_balance': 0,
+        'end_balance': float(balance),
+        'transactions': transactions,
+    }})
+
+
+def visa_csv(lastfour, rows):
+    lines = ['Date,Transaction,Name,Memo,Amount']
+    for date, amount, memo in _history(lastfour, rows):
+        kind = 'CREDIT' if amount > 0 else 'DEBIT'
+        lines.append(f'{date:%m/%d/%Y},{kind},{memo},,{amount}')
+    return '\n'.join(lines) + '\n'
+
+
+# Linked from every page.
+_ASSETS = '''<img src="/static/banner.png"><img src="/static/promo.jpg">
+    <style>@font-face { font-family: brand; src: url(/static/brand.woff2); }
+    body { font-family: brand; }</style>'''
+
+_ASSET_BYTES = 200 * 1024
+
+_PAGES = {
+    '/venmo/sign-in': """<html><head><title>Sign in</title></head><body>{assets}
+        <form action="/venmo/welcome">
+        <input name="phoneEmailUsername"><input name="password" type="password">
+        </form></body></html>""",
+    '/venmo/welcome': """<html><head><title>Welcome</title></head><body>{assets}
+        </body></html>""",
+    '/fidelity': """<html><body>{assets}<form action="/fidelity/summary">
+        <input id="userId-input" name="user"><input id="password" type="password">
+        <button id="fs-login-button" type="submit">Log in</button>
+        </form></body></html>""",
+    '/fidelity/summary': """<html><body>{assets}<h1>Your Balance History</h1>
+        <div data-acct-name="Fidelity&reg; Rewards Visa Signature"
+             data-acct-number="{lastfour}">Visa {lastfour}</div>
+        <div>Current Balance <span class="green-value">$1,234.56</span></div>
+        <a id="viewTransactions" href="/fidelity/transactions"
+           target="_blank">View Transactions</a></body></html>""",
+    '/fidelity/transactions': """<html><body>{assets}
+        <a id="navDownloadTransactionDataAnchor" href="/fidelity/download">
+        Download</a></body></html>""",
+    '/fidelity/download': """<html><body>{assets}
+        <form action="/fidelity/download.csv">
+        <select name="dnldFileType"><option>Microsoft Excel</option></select>
+        <input id="startDate" name="start">
+        <input id="endDate" name="end" value="{today:%m/%d/%Y}">
+        <input type="submit" name="Download" value="Download">
+        </form></body></html>""",
+}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # set on the subclass made by serve()
+    rows = 1000
+    latency = 0.0
+    fail_rate = 0.0
+    lastfour = '1234'
+
+    def log_message(self, *args):
+        pass
+
+    def _delay_or_fail(self):
+        time.sleep(self.latency)
+        if random.random() < self.fail_rate:
+            self.send_error(503, 'fake outage')
+            return True
+        return False
+
+    def _send(self, body, content_type, headers=()):
+        data = body.encode()
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        for header in headers:
+            self.send_header(*header)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        if self._delay_or_fail():
+            return
+        request = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if urlparse(self.path).path != '/ofx':
+            self.send_error(404)
+            return
+        acctids = re.findall(r'<ACCTID>([^<\s]+)', request.decode())
+        self._send(ofx_response(acctids, self.rows), 'application/x-ofx')
+
+    def do_GET(self):
+        if self._delay_or_fail():
+            return
+        path = urlparse(self.path).path
+        if path == '/venmo/transaction-history':
+            self._send(venmo_history(VENMO_USER, self.rows), 'application/json')
+        elif path == '/fidelity/download.csv':
+            self._send(visa_csv(self.lastfour, self.rows), 'application/x-csv',
+                       [('Content-Disposition', 'attachment; filename="download.csv"')])
+        elif path.startswith('/static/'):
+            self._send('\0' * _ASSET_BYTES, 'application/octet-stream')
+        elif path in _PAGES:
+            self._send(_PAGES[path].format(lastfour=self.lastfour,
+                                           today=datetime.now(), assets=_ASSETS),
+                       'text/html; charset=utf-8')
+        else:
+            self.send_error(404)
+
+
+def serve(port=0, rows=1000, latency=0.0, fail_rate=0.0, lastfour='1234'):
+    """
+    Start the server on localhost in a background thread. Returns the
+    server; its base URL is http://127.0.0.1:<server.server_port>.
+    """
+    handler = type('Handler', (_Handler,), {
+        'rows': rows, 'latency': latency, 'fail_rate': fail_rate,
+        'lastfour': lastfour,
+    })
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def patch_backends(base_url):
+    """Point every backend at a fake bank server at base_url."""
+    from bank_wrangler.bank import fidelity, fidelity_visa, venmo
+    fidelity.OFX_URL = base_url + '/ofx'
+    fidelity_visa.LOGIN_URL = base_url + '/fidelity'
+    venmo.SIGN_IN_URL = base_url + '/venmo/sign-in'
+    venmo.HISTORY_URL = base_url + '/venmo/transaction-history'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--fail-rate', type=float, default=0.0)
+    args = parser.parse_args()
+    server = serve(args.port, args.rows, args.latency, args.fail_rate)
+    print(f'serving on http://127.0.0.1:{server.server_port}')
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
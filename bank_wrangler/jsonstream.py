@@ -0,0 +1,111 @@
+"""
+Incremental reading of JSON documents too large to load at once.
+
+A Reader pulls the document from a text file a chunk at a time. The caller
+walks the objects and arrays it cares about with `keys` and `items`, and
+decodes everything else, like each element of a long array, with `value`:
+
+    reader = Reader(fileobj)
+    for key in reader.keys():
+        if key == 'transactions':
+            for _ in reader.items():
+                handle(reader.value())
+        else:
+            other[key] = reader.value()
+
+Only the value being decoded and one chunk are held in memory.
+"""
+
+
+import json
+import re
+
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+# Characters that can continue a number. In valid JSON a value is followed
+# by whitespace or punctuation, never by one of these.
+_NUMBER = frozenset('0123456789.eE+-')
+
+
+class Reader:
+    def __init__(self, fileobj, chunk_size=1 << 16, **kwargs):
+        """kwargs are passed on to json.JSONDecoder, e.g. parse_float."""
+        self.fileobj = fileobj
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder(**kwargs)
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        data = self.fileobj.read(self.chunk_size)
+        self.eof = not data
+        self.buf = self.buf[self.pos:] + data
+        self.pos = 0
+
+    def _peek(self):
+        """The next character that is not whitespace, or '' at the end."""
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if self.eof:
+                return ''
+            self._fill()
+
+    def _expect(self, chars):
+        c = self._peek()
+        if not c or c not in chars:
+            raise ValueError('expected one of {!r} at {!r}'.format(
+                chars, self.buf[self.pos:self.pos + 20]))
+        self.pos += 1
+        return c
+
+    def value(self):
+        """Decode the next value as a whole."""
+        self._peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            else:
+                # a number cut off by the end of the buffer decodes too
+                if self.eof or (end < len(self.buf) and
+                                self.buf[end] not in _NUMBER):
+                    self.pos = end
+                    return value
+            self._fill()
+
+    def keys(self):
+        """
+        Step into the next value, an object, yielding each of its keys. The
+        caller consumes the key's value before asking for the next key.
+        """
+        self._expect('{')
+        if self._peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            if not isinstance(key, str):
+                raise ValueError(f'object key {key!r} is not a string')
+            self._expect(':')
+            yield key
+            if self._expect(',}') == '}':
+                return
+
+    def items(self):
+        """
+        Step into the next value, an array, yielding once per element. The
+        caller consumes each element before asking for the next.
+        """
+        self._expect('[')
+        if self._peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield
+            if self._expect(',]') == ']':
+                return
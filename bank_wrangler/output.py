@@ -0,0 +1,65 @@
+"""
+Streaming writers for tabular output.
+
+Unlike tabulate, these never hold more than a small sample of rows: the
+table writer sizes its columns from the first rows it sees and prints the
+rest as they arrive.
+"""
+
+
+from decimal import Decimal
+from itertools import chain, islice
+import csv
+import json
+
+
+FORMATS = ['table', 'csv', 'jsonl']
+
+
+def write_table(rows, headers, fileobj, sample=100):
+    """
+    Write rows as an aligned plain-text table. Column widths are sized to
+    the headers and the first `sample` rows; later cells that are wider are
+    printed in full rather than truncated.
+    """
+    rows = iter(rows)
+    head = list(islice(rows, sample))
+    widths = [len(h) for h in headers]
+    numeric = [bool(head)] * len(headers)
+    for row in head:
+        for i, value in enumerate(row):
+            widths[i] = max(widths[i], len(str(value)))
+            numeric[i] = numeric[i] and isinstance(value, (int, Decimal))
+
+    def line(cells):
+        return '  '.join(
+            cell.rjust(width) if right else cell.ljust(width)
+            for cell, width, right in zip(cells, widths, numeric)
+        ).rstrip()
+
+    fileobj.write(line(headers) + '\n')
+    fileobj.write(line(['-' * w for w in widths]) + '\n')
+    for row in chain(head, rows):
+        fileobj.write(line([str(value) for value in row]) + '\n')
+
+
+def write_csv(rows, headers, fileobj):
+    writer = csv.writer(fileobj)
+    writer.writerow(headers)
+    for row in rows:
+        writer.writerow([str(value) for value in row])
+
+
+def write_jsonl(rows, headers, fileobj):
+    for row in rows:
+        fileobj.write(json.dumps(dict(zip(headers, map(str, row)))) + '\n')
+
+
+def write(fmt, rows, headers, fileobj):
+    """Write rows in one of FORMATS."""
+    writers = {
+        'table': write_table,
+        'csv': write_csv,
+        'jsonl': write_jsonl,
+    }
+    writers[fmt](rows, headers, fileobj)
@@ -0,0 +1,168 @@
+"""
+Detect recurring payments such as subscriptions and bills.
+
+Transactions are grouped by direction, normalized description and a
+logarithmic amount bucket, all through one dict, so similar transactions
+meet without being compared pairwise. Adjacent buckets of the same
+description are joined so that an amount near a bucket edge, or a small
+price change, stays in its group. Each group's dates are sorted and the
+median gap between them picks the period; the group counts as recurring
+if most gaps are about one period, or a few periods where some payments
+were missed.
+"""
+
+
+from calendar import monthrange
+from collections import defaultdict
+from datetime import date
+from functools import lru_cache
+from decimal import Decimal
+from math import floor, log
+from statistics import median
+from typing import NamedTuple
+import re
+from bank_wrangler import schema
+
+
+# Amounts within about this ratio of each other share a bucket.
+AMOUNT_TOLERANCE = 0.2
+
+# name, nominal length in days, tolerance in days
+PERIODS = [
+    ('weekly', 7, 1),
+    ('biweekly', 14, 2),
+    ('monthly', 30.44, 4),
+    ('quarterly', 91.31, 8),
+    ('annual', 365.25, 15),
+]
+
+# The share of gaps that must fit the period.
+REGULARITY = 0.75
+
+
+class Recurring(NamedTuple):
+    description: str   # of the most recent transaction
+    source: str
+    to: str
+    period: str
+    count: int
+    typical: Decimal   # median amount
+    last_amount: Decimal
+    last_date: schema.Date
+    next_date: schema.Date
+    missed: int        # payments missing between the first and the last
+    overdue: bool      # the next payment is late as of the given date
+    amount_changed: bool
+
+
+@lru_cache(maxsize=1 << 16)
+def normalize(description):
+    """Lowercase words of description, without numbers and punctuation."""
+    return ' '.join(re.findall('[a-z]+', description.lower()))
+
+
+def _bucket(amount):
+    return floor(log(float(amount)) / log(1 + AMOUNT_TOLERANCE))
+
+
+def _groups(transactions):
+    buckets = defaultdict(list)
+    for t in transactions:
+        if t.amount > 0:
+            key = (t.source, t.to, normalize(schema.describe(t)))
+            buckets[key, _bucket(t.amount)].append(t)
+    by_key = defaultdict(list)
+    for key, bucket in buckets:
+        by_key[key].append(bucket)
+    for key, ids in by_key.items():
+        ids.sort()
+        group = []
+        for i, bucket in enumerate(ids):
+            if group and bucket != ids[i - 1] + 1:
+                yield group
+                group = []
+            group.extend(buckets[key, bucket])
+        yield group
+
+
+def _ordinal(d):
+    return date(*d.value).toordinal()
+
+
+def _add_months(d, months):
+    year, month = divmod(d.month - 1 + months, 12)
+    year, month = d.year + year, month + 1
+    return date(year, month, min(d.day, monthrange(year, month)[1]))
+
+
+def _next(last, period, gap):
+    last = date(*last.value)
+    if period == 'monthly':
+        result = _add_months(last, 1)
+    elif period == 'quarterly':
+        result = _add_months(last, 3)
+    elif period == 'annual':
+        result = _add_months(last, 12)
+    else:
+        result = date.fromordinal(last.toordinal() + round(gap))
+    return schema.Date(result.year, result.month, result.day)
+
+
+def _detect_group(group, as_of, min_count):
+    if len(group) < min_count:
+        return None
+    group.sort(key=lambda t: t.date)
+    days = sorted({_ordinal(t.date) for t in group})
+    if len(days) < min_count:
+        return None
+    gaps = [b - a for a, b in zip(days, days[1:])]
+    gap = median(gaps)
+    for period, length, tolerance in PERIODS:
+        if abs(gap - length) <= tolerance:
+            break
+    else:
+        return None
+    missed = 0
+    regular = 0
+    for g in gaps:
+        periods = round(g / gap)
+        if periods >= 1 and abs(g - periods * gap) <= tolerance * periods:
+            regular += 1
+            missed += periods - 1
+    if regular < REGULARITY * len(gaps):
+        return None
+    last = group[-1]
+    amounts = [t.amount for t in group]
+    next_date = _next(last.date, period, gap)
+    return Recurring(
+        description=schema.describe(last),
+        source=last.source,
+        to=last.to,
+        period=period,
+        count=len(group),
+        typical=median(amounts),
+        last_amount=last.amount,
+        last_date=last.date,
+        next_date=next_date,
+        missed=missed,
+        overdue=_ordinal(as_of) > _ordinal(next_date) + tolerance,
+        amount_changed=len(amounts) > 1 and amounts[-1] != amounts[-2],
+    )
+
+
+def detect(transactions, as_of=None, min_count=3):
+    """
+    The recurring payments among transactions with at least min_count
+    occurrences, sorted by next expected date. Payments count as overdue
+    relative to as_of, a schema.Date, which defaults to today.
+    """
+    if as_of is None:
+        today = date.today()
+        as_of = schema.Date(today.year, today.month, today.day)
+    result = []
+    for group in _groups(transactions):
+        found = _detect_group(group, as_of, min_count)
+        if found is not None:
+            result.append(found)
+    result.sort(key=lambda r: (r.next_date, r.description))
+    return result
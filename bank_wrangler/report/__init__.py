@@ -1,24 +1,64 @@
 import os
-from glob import glob
 from itertools import chain
 from typing import Iterable
+import datetime
+import gzip
 import json
 import jinja2
 import shutil
-from bank_wrangler import schema
+try:
+    import brotli
+except ImportError:
+    brotli = None
+from bank_wrangler import schema, trace
+from bank_wrangler.balance import BalanceIndex
+from bank_wrangler.report.bundle import bundles
+from bank_wrangler.report.downsample import sample_indices
+
+
+# Default number of points the Balance chart draws for the whole history.
+MAX_POINTS = 1000
 
 
 def _generate_data_json(transactions, accounts):
-    transactions = [list(map(str, row))
-                    for row in transactions]
+    transactions = [list(map(str, schema.display_row(t)))
+                    for t in transactions]
     return json.dumps({
-        'columns': schema.Transaction._fields,
+        'columns': schema.DISPLAY_FIELDS,
         'transactions': transactions,
         'accounts': accounts
     })
 
 
-def _generate_pages(html_path, css_names, js_names):
+def _generate_balance_json(transactions, accounts, max_points):
+    """
+    Balance of each account at the end of every date with a transaction.
+    The full series is included for zoomed-in views, along with `sampled`,
+    the indices to plot when a range has more than max_points dates.
+    """
+    index = BalanceIndex(transactions)
+    dates = sorted({t.date for t in transactions})
+    balances = {account: [float(index.balance(account, date)) for date in dates]
+                for account in accounts}
+    days = [datetime.date(*date.value).toordinal() for date in dates]
+    return json.dumps({
+        'dates': list(map(str, dates)),
+        'accounts': accounts,
+        'balances': balances,
+        'sampled': sample_indices(days, list(balances.values()), max_points),
+        'maxPoints': max_points,
+    })
+
+
+def _compressed(data):
+    """The precompressed siblings of a file's contents, by extension."""
+    result = {'.gz': gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        result['.br'] = brotli.compress(data)
+    return result
+
+
+def _generate_pages(html_path, imports):
     env = jinja2.Environment(
         undefined=jinja2.StrictUndefined,
         loader = jinja2.FileSystemLoader(html_path),
@@ -35,48 +75,84 @@ def _generate_pages(html_path, css_names, js_names):
 
     # used by base.html
     env.globals = {
-        'cssimports': css_names,
-        'jsimports': js_names,
         'pages': [{'name': title, 'url': filename}
                   for title, filename in pages.items()],
     }
 
-    return {filename: env.get_template(filename).render(selectedpage=filename)
+    return {filename: env.get_template(filename).render(
+                selectedpage=filename, **imports[filename])
             for filename in pages.values()}
 
 
-def generate(root, transactions, accounts: Iterable[str]):
-    """Write the report to <root>/report directory."""
+def render(transactions, accounts: Iterable[str], max_points=MAX_POINTS):
+    """
+    Render the report as a dict of filename to contents. The Balance chart
+    plots at most about max_points dates unless zoomed in.
+    """
     reportdir = os.path.dirname(os.path.abspath(__file__))
     html_path = os.path.join(reportdir, 'html')
-    css_paths = glob(os.path.join(reportdir, 'libs', '*.css'))
-    js_paths = (glob(os.path.join(reportdir, 'libs', '*.js')) +
-                glob(os.path.join(reportdir, 'js', '*.js')))
-
-    files = {}
-    for path in css_paths + js_paths:
-        fname = os.path.basename(path)
-        with open(path, 'r') as f:
-            files[fname] = f.read()
-
-    files['data.js'] = 'const transactionModel = {};'.format(
-        _generate_data_json(transactions, list(accounts))
-    )
 
-    css_names = list(map(os.path.basename, css_paths))
-    js_names = list(map(os.path.basename, js_paths)) + ['data.js']
-    for filename, text in _generate_pages(html_path,
-                                          css_names,
-                                          js_names).items():
-        files[filename] = text
+    with trace.span('bundle assets') as s:
+        files, imports = bundles(reportdir)
+        s['rows'] = len(files)
+
+    accounts = list(accounts)
+    with trace.span('_generate_data_json') as s:
+        transactions = list(transactions)
+        files['data.js'] = 'const transactionModel = {};'.format(
+            _generate_data_json(transactions, accounts)
+        )
+        s['rows'] = len(transactions)
+    with trace.span('_generate_balance_json'):
+        files['data.js'] += '\nconst balanceModel = {};'.format(
+            _generate_balance_json(transactions, accounts, max_points)
+        )
+
+    with trace.span('render pages') as s:
+        pages = _generate_pages(html_path, imports)
+        s['rows'] = len(pages)
+    files.update(pages)
+    return files
 
+
+def write(root, files, previous=None):
+    """
+    Write rendered files to the <root>/report directory. If previous is the
+    dict of files last written there, only files that changed are written
+    and files that went away are removed; otherwise the directory is
+    recreated. Each file is written with .gz and, if brotli is installed,
+    .br siblings for a web server to send as is. Returns the names of the
+    files written.
+    """
     outdir = os.path.join(root, 'report')
-    try:
-        shutil.rmtree(outdir)
-    except FileNotFoundError:
-        pass
-    os.mkdir(outdir)
-    for filename, datastring in files.items():
-        path = os.path.join(outdir, filename)
-        with open(path, 'w') as f:
-            f.write(datastring)
+    if previous is None:
+        try:
+            shutil.rmtree(outdir)
+        except FileNotFoundError:
+            pass
+        os.mkdir(outdir)
+        previous = {}
+    for filename in previous.keys() - files.keys():
+        for extension in ('', '.gz', '.br'):
+            try:
+                os.remove(os.path.join(outdir, filename + extension))
+            except FileNotFoundError:
+                pass
+    changed = [filename for filename, datastring in files.items()
+               if previous.get(filename) != datastring]
+    with trace.span('write report files') as s:
+        for filename in changed:
+            path = os.path.join(outdir, filename)
+            data = files[filename].encode('utf-8')
+            with open(path, 'wb') as f:
+                f.write(data)
+            for extension, compressed in _compressed(data).items():
+                with open(path + extension, 'wb') as f:
+                    f.write(compressed)
+        s['rows'] = len(changed)
+    return changed
+
+
+def generate(root, transactions, accounts: Iterable[str], max_points=MAX_POINTS):
+    """Write the report to <root>/report directory."""
+    write(root, render(transactions, accounts, max_points))
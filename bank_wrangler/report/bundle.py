@@ -0,0 +1,112 @@
+"""
+Per-page bundles of the report's scripts and stylesheets.
+
+Each page loads one stylesheet and one script holding just the libraries
+and scripts it uses, concatenated in order. Bundles are named by a hash of
+their contents, so pages that need the same assets share a bundle and a
+browser never keeps a stale one cached. The libraries fetched into libs/
+are already minified; our own scripts and stylesheets are minified here.
+"""
+
+
+from hashlib import sha1
+import os
+import re
+
+
+# The assets each page uses, in load order. A .js or .css name is looked up
+# in libs/, then js/; names that are missing (libs/ not fetched) are left
+# out. data.js is rendered separately and listed for the pages that use it.
+PAGES = {
+    'index.html': ['pure-min.css'],
+    'list.html': ['pure-min.css', 'datatables.min.css',
+                  'datatables.min.js', 'data.js'],
+    'balance.html': ['pure-min.css', 'nouislider.min.css',
+                     'Chart.bundle.min.js', 'nouislider.min.js',
+                     'chartconfig.js', 'data.js'],
+    'spending.html': ['pure-min.css', 'nouislider.min.css',
+                      'Chart.bundle.min.js', 'nouislider.min.js',
+                      'spending.js', 'data.js'],
+}
+
+# Rendered per report rather than bundled, since it changes every time.
+DATA = 'data.js'
+
+_JS_TOKEN = re.compile(r"""
+      (?P<string>'(?:\\.|[^'\\\n])*'|"(?:\\.|[^"\\\n])*"|`(?:\\.|[^`\\])*`)
+    | (?P<block>/\*.*?\*/)
+    | (?P<line>//[^\n]*)
+""", re.VERBOSE | re.DOTALL)
+
+
+def minify_js(source):
+    """
+    Drop comments, indentation and blank lines. Line breaks are kept so
+    automatic semicolon insertion is unaffected. Regex literals are not
+    recognized, so a quote or // inside one would confuse it.
+    """
+    def replace(match):
+        return match.group('string') or ''
+    source = _JS_TOKEN.sub(replace, source)
+    lines = (line.strip() for line in source.splitlines())
+    return '\n'.join(line for line in lines if line)
+
+
+def minify_css(source):
+    """Drop comments and the whitespace around braces and separators."""
+    source = re.sub(r'/\*.*?\*/', '', source, flags=re.DOTALL)
+    source = re.sub(r'\s+', ' ', source)
+    return re.sub(r'\s*([{};,])\s*', r'\1', source).strip()
+
+
+def _read(reportdir, name):
+    for directory in ('libs', 'js'):
+        path = os.path.join(reportdir, directory, name)
+        if os.path.exists(path):
+            with open(path) as f:
+                source = f.read()
+            if '.min.' in name or name.endswith('-min.css'):
+                return source
+            return minify_css(source) if name.endswith('.css') else minify_js(source)
+    return None
+
+
+def _bundle(reportdir, names, extension, cache):
+    parts = []
+    for name in names:
+        if name not in cache:
+            cache[name] = _read(reportdir, name)
+        if cache[name] is not None:
+            parts.append(cache[name])
+    if not parts:
+        return None, None
+    # a script without a trailing semicolon must not run into the next one
+    separator = '\n' if extension == 'css' else ';\n'
+    contents = separator.join(parts) + '\n'
+    digest = sha1(contents.encode('utf-8')).hexdigest()[:12]
+    return f'bundle-{digest}.{extension}', contents
+
+
+def bundles(reportdir):
+    """
+    Bundle the assets of each page. Returns the bundles as a dict of
+    filename to contents, and for each page a dict of the stylesheets and
+    the scripts it loads, for base.html.
+    """
+    files = {}
+    imports = {}
+    cache = {}
+    for page, names in PAGES.items():
+        css = [name for name in names if name.endswith('.css')]
+        js = [name for name in names if name.endswith('.js') and name != DATA]
+        page_imports = {'cssimports': [], 'jsimports': []}
+        for key, group, extension in (('cssimports', css, 'css'),
+                                      ('jsimports', js, 'js')):
+            filename, contents = _bundle(reportdir, group, extension, cache)
+            if filename is not None:
+                files[filename] = contents
+                page_imports[key].append(filename)
+        if DATA in names:
+            page_imports['jsimports'].append(DATA)
+        imports[page] = page_imports
+    return files, imports
@@ -0,0 +1,48 @@
+"""Shape-preserving downsampling of chart series."""
+
+
+def lttb(xs, ys, threshold):
+    """
+    Largest-Triangle-Three-Buckets: choose at most `threshold` indices of
+    the series (xs, ys), always keeping the first and last points, such that
+    the line through them keeps the visual shape of the full series.
+    Returns the chosen indices in increasing order.
+    """
+    n = len(xs)
+    if threshold >= n or threshold < 3:
+        return list(range(n))
+    bucket = (n - 2) / (threshold - 2)
+    result = [0]
+    a = 0
+    for i in range(threshold - 2):
+        # the average of the next bucket is the third triangle vertex
+        next_start = int((i + 1) * bucket) + 1
+        next_end = min(int((i + 2) * bucket) + 1, n)
+        count = next_end - next_start
+        avg_x = sum(xs[next_start:next_end]) / count
+        avg_y = sum(ys[next_start:next_end]) / count
+
+        best, best_area = None, -1
+        for j in range(int(i * bucket) + 1, int((i + 1) * bucket) + 1):
+            area = abs((xs[a] - avg_x) * (ys[j] - ys[a]) -
+                       (xs[a] - xs[j]) * (avg_y - ys[a]))
+            if area > best_area:
+                best, best_area = j, area
+        result.append(best)
+        a = best
+    result.append(n - 1)
+    return result
+
+
+def sample_indices(xs, series, max_points):
+    """
+    Indices of xs to plot so that every series in `series` (lists of ys
+    sharing xs) keeps its shape, using at most about max_points in total.
+    """
+    if len(xs) <= max_points or not series:
+        return list(range(len(xs)))
+    budget = max(3, max_points // len(series))
+    chosen = set()
+    for ys in series:
+        chosen.update(lttb(xs, ys, budget))
+    return sorted(chosen)
@@ -1,49 +1,22 @@
 'use strict';
 
-const dates = function dates(model) {
-    const dateColumn = model.columns.indexOf('date');
-    const set = new Set();
-    model.transactions.forEach(transaction => {
-        set.add(transaction[dateColumn]);
-    });
-    const result = [...set];
-    result.sort();
-    return result;
-};
-
-const deltaAmounts = function deltaAmounts(model, account) {
-    const toColumn = model.columns.indexOf('to');
-    const fromColumn = model.columns.indexOf('source');
-    const dateColumn = model.columns.indexOf('date');
-    const amountColumn = model.columns.indexOf('amount');
-    const map = new Map();
-    dates(model).forEach(date => {
-        map.set(date, 0.0);
-    });
-    model.transactions.forEach(transaction => {
-        const date = transaction[dateColumn];
-        const amount = parseFloat(transaction[amountColumn]);
-        if (account === transaction[toColumn]) {
-            map.set(date, map.get(date) + amount);
-        } else if (account === transaction[fromColumn]) {
-            map.set(date, map.get(date) - amount);
+/**
+ * Indices of the balance dates to plot between the date indices low and
+ * high inclusive. Plots every date if there are few enough of them, and
+ * otherwise the downsampled indices chosen by the report generator.
+ */
+const plottedIndices = function plottedIndices(model, low, high) {
+    if (high - low + 1 <= model.maxPoints) {
+        const result = [];
+        for (let i = low; i <= high; i++) {
+            result.push(i);
         }
-    });
-    return Array.from(map.values());
+        return result;
+    }
+    return model.sampled.filter(i => low <= i && i <= high);
 };
 
-const cumulativeAmounts = function cumulativeAmounts(deltaAmounts) {
-    const result = [];
-    let rollingsum = 0.0;
-    deltaAmounts.forEach(delta => {
-        // round to 2 decimal places
-        rollingsum = Math.round(100*(rollingsum + delta))/100;
-        result.push(rollingsum);
-    });
-    return result;
-};
-
-window.chartConfig = function chartConfig(model) {
+const balanceData = function balanceData(model, low, high) {
     const chartColors = [
         'rgb(255, 99, 132)',
         'rgb(255, 159, 64)',
@@ -53,19 +26,25 @@ window.chartConfig = function chartConfig(model) {
         'rgb(153, 102, 255)',
         'rgb(201, 203, 207)'
     ];
+    const indices = plottedIndices(model, low, high);
+    return {
+        labels: indices.map(i => model.dates[i]),
+        datasets: model.accounts.map((account, index) => {
+            const balances = model.balances[account];
+            return {
+                label: account,
+                borderColor: chartColors[index % chartColors.length],
+                backgroundColor: chartColors[index % chartColors.length],
+                data: indices.map(i => balances[i]),
+            }
+        })
+    };
+};
+
+window.chartConfig = function chartConfig(model) {
     return {
         type: 'line',
-        data: {
-            labels: dates(model),
-            datasets: model.accounts.map((account, index) => {
-                return {
-                    label: account,
-                    borderColor: chartColors[index % chartColors.length],
-                    backgroundColor: chartColors[index % chartColors.length],
-                    data: cumulativeAmounts(deltaAmounts(model, account)),
-                }
-            })
-        },
+        data: balanceData(model, 0, model.dates.length - 1),
         options: {
             scales: {
                 yAxes: [{
@@ -85,3 +64,33 @@ window.chartConfig = function chartConfig(model) {
         }
     };
 };
+
+window.balanceSliderConfig = function balanceSliderConfig(model) {
+    const last = Math.max(model.dates.length - 1, 1);
+    return {
+        start: [0, last],
+        connect: true,
+        step: 1,
+        range: {
+            'min': [ 0 ],
+            'max': [ last ],
+        },
+    };
+};
+
+/**
+ * Zoom the chart to the date range selected on the slider, plotting the
+ * full-resolution series once the range is small enough.
+ */
+window.connectBalanceSlider = function connectBalanceSlider(slider, chart, model, displaylow, displayhigh) {
+    slider.noUiSlider.on('update', function(values, handle) {
+        const selected = [displaylow, displayhigh][handle];
+        selected.innerHTML = model.dates[parseInt(values[handle])] || '';
+    });
+    slider.noUiSlider.on('set', function(values) {
+        const low = parseInt(values[0]);
+        const high = Math.min(parseInt(values[1]), model.dates.length - 1);
+        chart.data = balanceData(model, low, high);
+        chart.update(0);
+    });
+};
@@ -1,24 +1,59 @@
 from atomicwrites import atomic_write
-import importlib
+import importlib.util
 import os
 
 
 rules_boilerplate = """\
-from bank_wrangler.schema import Transaction
+from bank_wrangler.schema import Transaction, describe, legacy_description
 
 def pre_stitch(transaction):
     '''transformtion applied before stitching transactions together'''
     # example
     # if transaction.source == 'foo':
     #     return transaction._replace(description='bar')
+    # backends that know more fill transaction.meta, for example
+    # if transaction.meta and transaction.meta.counterparty == 'landlord':
+    #     return transaction._replace(category='Rent')
+    # Venmo used to put that JSON-encoded in the description, which is now
+    # empty; legacy_description(transaction) still gives the old text
     return transaction
 
 def post_stitch(transaction):
     '''transformation applied after stitching transactions together'''
+    # stitched transfers keep their own description; describe(transaction)
+    # joins it with the other side's, as shown in the report
     return transaction
 """
 
 
+accepted_categories_template = """
+
+# categories accepted from `bank-wrangler suggest-categories`
+from bank_wrangler.schema import describe as _describe, legacy_description as _legacy
+def post_stitch(transaction, _previous=post_stitch, _accepted={!r}):
+    transaction = _previous(transaction)
+    if transaction.category in ('', 'Unknown'):
+        category = _accepted.get(_describe(transaction),
+                                 _accepted.get(_legacy(transaction)))
+        if category is not None:
+            return transaction._replace(category=category)
+    return transaction
+"""
+
+
+# The lookup of blocks appended before transactions had meta, and what
+# migrate replaces it with.
+_old_lookup = """\
+    if transaction.category in ('', 'Unknown') and transaction.description in _accepted:
+        return transaction._replace(category=_accepted[transaction.description])
+"""
+_migrated_lookup = """\
+    from bank_wrangler.schema import legacy_description as _legacy
+    if transaction.category in ('', 'Unknown') and _legacy(transaction) in _accepted:
+        return transaction._replace(category=_accepted[_legacy(transaction)])
+"""
+
+
 class Rules:
     def __init__(self, root):
         self.path = os.path.join(root, 'rules.py')
@@ -30,6 +65,30 @@ class Rules:
     def exists(self):
         return os.path.exists(self.path)
 
+    def add_categories(self, categories):
+        """
+        Append a post_stitch wrapper to rules.py that assigns categories to
+        uncategorized transactions by exact description.
+        """
+        with open(self.path) as f:
+            text = f.read()
+        with atomic_write(self.path, mode='w', overwrite=True) as f:
+            f.write(text + accepted_categories_template.format(categories))
+
+    def migrate(self):
+        """
+        Make categories accepted before transactions had meta match Venmo
+        transactions again, by looking them up by legacy_description.
+        Returns the number of blocks changed.
+        """
+        with open(self.path) as f:
+            text = f.read()
+        count = text.count(_old_lookup)
+        if count:
+            with atomic_write(self.path, mode='w', overwrite=True) as f:
+                f.write(text.replace(_old_lookup, _migrated_lookup))
+        return count
+
     def get_module(self):
         spec = importlib.util.spec_from_file_location('module.name', self.path)
         rules = importlib.util.module_from_spec(spec)
@@ -3,7 +3,8 @@
 
 from decimal import Decimal
 from functools import total_ordering
-from typing import NamedTuple
+import json
+from typing import NamedTuple, Optional
 
 
 @total_ordering
@@ -31,6 +32,21 @@ class Date:
         return self.value.__hash__()
 
 
+class Meta(NamedTuple):
+    """
+    Structured details a backend knows about a transaction, for rules to
+    read directly. stitch sets the last two: matched, the description and
+    meta of the other side of a matched transfer, and missing, the account
+    a transfer's counterpart was not found in.
+    """
+    counterparty: str = ''
+    note: str = ''
+    funding_source: str = ''
+    raw_id: str = ''
+    matched: Optional[tuple] = None
+    missing: str = ''
+
+
 class Transaction(NamedTuple):
     source: str
     to: str
@@ -38,3 +54,100 @@ class Transaction(NamedTuple):
     description: str
     amount: Decimal
     category: str = 'Unknown'
+    meta: Optional[Meta] = None
+
+
+# The fields shown to users, with the description rendered by describe.
+DISPLAY_FIELDS = ('source', 'to', 'date', 'description', 'amount', 'category')
+
+
+def _side(description, meta, legacy):
+    """One side of a transfer as describe, or legacy_description, gives it."""
+    if description or meta is None:
+        return description
+    if legacy:
+        return json.dumps({'other': meta.counterparty, 'note': meta.note})
+    if meta.counterparty and meta.note:
+        return '{}: {}'.format(meta.counterparty, meta.note)
+    return meta.counterparty or meta.note
+
+
+def _render(transaction, legacy):
+    meta = transaction.meta
+    text = _side(transaction.description, meta, legacy)
+    if meta is not None and meta.matched is not None:
+        description, other = meta.matched
+        text = '{} + {}'.format(text, _side(description, other, legacy))
+    elif meta is not None and meta.missing:
+        text = '{} [missing corresponding txn in {}]'.format(text, meta.missing)
+    return text
+
+
+def describe(transaction):
+    """
+    The description to display: the description, or if it is empty, one
+    rendered from the metadata, joined with the other side's for stitched
+    transfers.
+    """
+    return _render(transaction, legacy=False)
+
+
+def legacy_description(transaction):
+    """
+    The description as versions before Meta gave it: for Venmo, whose
+    descriptions are now empty, the JSON of the counterparty and note, and
+    for stitched transfers, both sides joined as stitch used to write them
+    into the description. For rules written against those descriptions.
+    """
+    return _render(transaction, legacy=True)
+
+
+def display_row(transaction):
+    """The values of DISPLAY_FIELDS."""
+    return transaction[:3] + (describe(transaction),) + transaction[4:6]
+
+
+def cents(amount):
+    """
+    A Decimal amount in whole hundredths. Some banks report fractions of a
+    cent; those are rounded half to even.
+    """
+    return int((amount * 100).to_integral_value())
+
+
+def to_row(transaction):
+    """
+    Flatten a Transaction into a tuple of str, int and None, which pickles
+    much smaller and faster than Decimal and Date objects.
+    """
+    year, month, day = transaction.date.value
+    meta = _meta_row(transaction.meta)
+    return (transaction.source, transaction.to, year * 10000 + month * 100 + day,
+            transaction.description, str(transaction.amount), transaction.category,
+            meta)
+
+
+def from_row(row):
+    """Inverse of to_row."""
+    source, to, date, description, amount, category, meta = row
+    return Transaction(source, to, Date(date // 10000, date // 100 % 100, date % 100),
+                       description, Decimal(amount), category, _meta(meta))
+
+
+def _meta_row(meta):
+    if meta is None:
+        return None
+    if meta.matched is not None:
+        description, other = meta.matched
+        meta = meta._replace(matched=(description, _meta_row(other)))
+    return tuple(meta)
+
+
+def _meta(row):
+    if row is None:
+        return None
+    meta = Meta(*row)
+    if meta.matched is not None:
+        description, other = meta.matched
+        meta = meta._replace(matched=(description, _meta(other)))
+    return meta
@@ -0,0 +1,208 @@
+"""
+Snapshot isolation for the files that fetches and config changes replace.
+
+Writers never replace such a file (a .data file, the vault, vault-keys) in
+place. The new version is written under a new physical name, <name>.<gen>,
+and snapshot.json, which lists the physical file of every name in the
+current generation, is replaced atomically to publish it. Several files
+changed by one writer, like the vault and vault-keys, are published
+together. The new files are synced to disk before the manifest names
+them, and replaced files are only deleted once the new manifest is
+durable, so a crash leaves one complete generation or the other.
+Writers hold an exclusive lock on locks/writer, so they serialize
+against each other.
+
+A reader holds a shared lock on locks/<gen> for as long as it reads, and
+sees the files of that generation however long it takes, without blocking
+writers. After publishing, a writer deletes the files that newer
+generations replaced once no reader holds the lock of a generation that
+still uses them.
+
+Roots from before snapshots have no snapshot.json; their files are read
+under their plain names as generation 0. Without fcntl (Windows) there is
+no locking, and replaced files are deleted right away.
+"""
+
+
+from contextlib import contextmanager
+from atomicwrites import atomic_write
+import json
+import os
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+MANIFEST = 'snapshot.json'
+LOCKS = 'locks'
+
+
+def _load(root):
+    try:
+        with open(os.path.join(root, MANIFEST)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {'generation': 0, 'files': {}, 'garbage': []}
+
+
+def _save(root, manifest):
+    with atomic_write(os.path.join(root, MANIFEST), mode='w', overwrite=True) as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+
+def _fsync(path, directory=False):
+    if directory and os.name == 'nt':
+        # directories cannot be opened there, and renames are durable
+        return
+    fd = os.open(path, os.O_RDONLY if directory else os.O_RDWR)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+@contextmanager
+def _locked(root, name, operation):
+    os.makedirs(os.path.join(root, LOCKS), exist_ok=True)
+    with open(os.path.join(root, LOCKS, name), 'a') as f:
+        if fcntl is not None:
+            fcntl.flock(f, operation)
+        yield
+
+
+class Snapshot:
+    """The files of one generation."""
+
+    def __init__(self, root, manifest):
+        self.root = root
+        self.generation = manifest['generation']
+        self.files = manifest['files']
+
+    def path(self, name):
+        return os.path.join(self.root, self.files.get(name, name))
+
+
+def current(root):
+    """
+    The current snapshot, not locked, so its files may be deleted by a
+    later writer. For checking what exists.
+    """
+    return Snapshot(root, _load(root))
+
+
+@contextmanager
+def reader(root):
+    """Lock the current snapshot for reading until the block exits."""
+    shared = fcntl.LOCK_SH if fcntl is not None else None
+    while True:
+        snapshot = current(root)
+        with _locked(root, str(snapshot.generation), shared):
+            # a writer may have published and collected this generation
+            # between loading it and locking it
+            if _load(root)['generation'] == snapshot.generation:
+                yield snapshot
+                return
+
+
+class Writer:
+    """
+    The next generation, being written. path gives the files as the block
+    has left them so far, new_path the physical file to write a new version
+    of a name to.
+    """
+
+    def __init__(self, root, manifest):
+        self.root = root
+        self.manifest = manifest
+        self.generation = manifest['generation'] + 1
+        self.written = {}
+
+    def path(self, name):
+        physical = self.written.get(name, self.manifest['files'].get(name, name))
+        return os.path.join(self.root, physical)
+
+    def new_path(self, name):
+        self.written[name] = f'{name}.{self.generation}'
+        return os.path.join(self.root, self.written[name])
+
+    def _commit(self):
+        for physical in self.written.values():
+            _fsync(os.path.join(self.root, physical))
+        _fsync(self.root, directory=True)
+        files = dict(self.manifest['files'])
+        garbage = list(self.manifest['garbage'])
+        for name, physical in self.written.items():
+            previous = files.get(name, name)
+            if os.path.exists(os.path.join(self.root, previous)):
+                garbage.append([previous, self.manifest['generation']])
+            files[name] = physical
+        manifest = {'generation': self.generation, 'files': files,
+                    'garbage': garbage}
+        # atomic_write syncs the manifest and its directory before returning
+        _save(self.root, manifest)
+        _collect(self.root, manifest)
+
+    def _abort(self):
+        for physical in self.written.values():
+            try:
+                os.remove(os.path.join(self.root, physical))
+            except FileNotFoundError:
+                pass
+
+
+@contextmanager
+def writer(root):
+    """
+    Lock the root for writing and yield a Writer. The files it wrote are
+    published as the next generation when the block exits normally, and
+    deleted if it raises.
+    """
+    exclusive = fcntl.LOCK_EX if fcntl is not None else None
+    with _locked(root, 'writer', exclusive):
+        w = Writer(root, _load(root))
+        try:
+            yield w
+        except BaseException:
+            w._abort()
+            raise
+        if w.written:
+            w._commit()
+
+
+def _busy_generations(root, generation):
+    """Generations before generation that readers still hold."""
+    if fcntl is None:
+        return set()
+    busy = set()
+    for name in os.listdir(os.path.join(root, LOCKS)):
+        if name == 'writer' or int(name) >= generation:
+            continue
+        path = os.path.join(root, LOCKS, name)
+        with open(path, 'a') as f:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                busy.add(int(name))
+                continue
+            # a reader that opens it now locks a new file, then sees the
+            # generation is no longer current and moves on
+            os.remove(path)
+    return busy
+
+
+def _collect(root, manifest):
+    """Delete replaced files that no reader can still be using."""
+    oldest = min(_busy_generations(root, manifest['generation']),
+                 default=manifest['generation'])
+    keep = []
+    for physical, last_generation in manifest['garbage']:
+        if last_generation < oldest:
+            try:
+                os.remove(os.path.join(root, physical))
+            except FileNotFoundError:
+                pass
+        else:
+            keep.append([physical, last_generation])
+    if keep != manifest['garbage']:
+        _save(root, dict(manifest, garbage=keep))
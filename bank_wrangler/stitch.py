@@ -1,50 +1,244 @@
-from collections import defaultdict
-from bank_wrangler.schema import Transaction
+from collections import defaultdict, deque
+from itertools import chain
+import json
+import os
+from atomicwrites import atomic_write
+from bank_wrangler import schema
 
 
-def stitch(transactions_by_account):
-    result = []
-    needs_match = defaultdict(list)
+# Transfers are matched within groups sharing (source, to, date, amount).
+# Every input transaction has a slot, its index in input order. Matching
+# yields ops on slots (see _apply), and the outputs are the slots that
+# remain, in order. The ops depend only on which transfers match, so
+# StitchState saves them per group and applies them again while the group's
+# transfers stay the same.
+
+
+def _other(acct, t):
+    if t.source == acct:
+        return t.to
+    elif t.to == acct:
+        return t.source
+    raise ValueError('transaction {} in account {} has unexpected parties'.format(t, acct))
+
+
+def _group(transactions_by_account):
+    """
+    Returns the transfer groups, a dict of transfer key to the (slot,
+    account, transaction) entries of the transactions that involve another
+    account, in input order.
+    """
+    groups = defaultdict(list)
+    slot = 0
     for acct, ts in transactions_by_account.items():
         for t in ts:
-            k = (t.source, t.to, t.date, t.amount)
-            if k in needs_match:
-                matches = needs_match[k]
-                (_, match) = matches.pop()
-                if len(matches) == 0:
-                    del needs_match[k]
-                result.append(Transaction(
-                    t.source,
-                    t.to,
-                    t.date,
-                    '{} + {}'.format(t.description, match.description),
-                    t.amount,
-                    t.category,
-                ))
-                continue
-            if t.source == acct:
-                other = t.to
-            elif t.to == acct:
-                other = t.source
-            else:
-                raise ValueError('transaction {} in account {} has unexpected parties'.format(t, acct))
-            if other == '':
-                result.append(t)
-                continue
+            other = _other(acct, t)
+            if other != '':
+                if other not in transactions_by_account:
+                    raise ValueError('transaction {} references an unknown account {}'.format(t, other))
+                groups[(t.source, t.to, t.date, t.amount)].append((slot, acct, t))
+            slot += 1
+    return groups
+
+
+def _resolve(entries):
+    """
+    Match the transfers of one group. Returns ops (slot, matched slot,
+    side): a transfer that matched an earlier one from the other account
+    takes both descriptions and the earlier one is dropped; one that did
+    not match has its side ('source' or 'to') naming the missing account
+    cleared, and matched slot None.
+    """
+    ops = []
+    pending = defaultdict(deque)
+    for slot, acct, t in entries:
+        other = _other(acct, t)
+        if pending[other]:
+            ops.append((slot, pending[other].popleft()[0], None))
+        else:
+            pending[acct].append((slot, 'to' if t.source == acct else 'source'))
+    for waiting in pending.values():
+        for slot, side in waiting:
+            ops.append((slot, None, side))
+    return ops
+
+
+def _apply(transactions_by_account, ops):
+    """
+    Descriptions are left as they are; what stitch did is recorded in the
+    meta (see schema.Meta) and rendered by schema.describe. A matched pair
+    keeps the meta of the side that has one, so rules see its counterparty.
+    """
+    outputs = list(chain.from_iterable(transactions_by_account.values()))
+    inputs = outputs[:]
+    for slot, match, side in ops:
+        t = inputs[slot]
+        if match is not None:
+            other = inputs[match]
+            meta = t.meta or other.meta or schema.Meta()
+            outputs[slot] = t._replace(
+                meta=meta._replace(matched=(other.description, other.meta)))
+            outputs[match] = None
+        else:
+            meta = t.meta or schema.Meta()
+            outputs[slot] = t._replace(**{
+                side: '',
+                'meta': meta._replace(missing=getattr(t, side)),
+            })
+    return [t for t in outputs if t is not None]
+
+
+def _ops(transactions_by_account):
+    groups = _group(transactions_by_account)
+    return list(chain.from_iterable(map(_resolve, groups.values()))), len(groups)
+
+
+def stitch(transactions_by_account):
+    return _apply(transactions_by_account, _ops(transactions_by_account)[0])
+
+
+def _key(t):
+    """A transfer's group key as a string, for saving. Equal amounts like
+    1.0 and 1.00 group together, so the amount is normalized."""
+    return '{}\t{}\t{}/{}/{}\t{}'.format(t.source, t.to, *t.date.value, t.amount.normalize() + 0)
+
+
+def _transfers(transactions_by_account, acct):
+    """
+    {key: [index]} of the transfers in acct, by group key and in input
+    order, validated as in _group.
+    """
+    transfers = defaultdict(list)
+    for index, t in enumerate(transactions_by_account[acct]):
+        other = _other(acct, t)
+        if other != '':
             if other not in transactions_by_account:
                 raise ValueError('transaction {} references an unknown account {}'.format(t, other))
-            needs_match[(t.source, t.to, t.date, t.amount)].append((acct, t))
-    for ts in needs_match.values():
-        for (acct, t) in ts:
-            # a transaction with another party involved needs a corresponding
-            # transaction with opposite direction. if it does not exist, remove
-            # the reference to the other account and make note of it.
-            fmt = '{} [missing corresponding txn in {}]'
-            if t.source == acct:
-                t = t._replace(to='', description=fmt.format(t.description, t.to))
-            elif t.to == acct:
-                t = t._replace(source='', description=fmt.format(t.description, t.source))
-            else:
-                assert False
-            result.append(t)
-    return result
+            transfers[_key(t)].append(index)
+    return transfers
+
+
+def _ops_of(flat):
+    """The saved ops of a group, which are stored flattened."""
+    fields = iter(flat)
+    return zip(fields, fields, fields, fields, fields)
+
+
+class StitchState:
+    """
+    What the last run matched, persisted in <root>/stitch-state.json: the
+    version of every account, and for every group the transfers that were
+    paired and those left unmatched, as ops (account position, index,
+    matched account position, matched index, side) keyed by _key.
+    """
+
+    def __init__(self, root):
+        self.path = os.path.join(root, 'stitch-state.json')
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def stitch(self, transactions_by_account, versions=None, verify=False):
+        """
+        Same as stitch(transactions_by_account). versions is {account: any
+        JSON value that changes whenever the account's transactions may
+        have}, such as the identity of the file they were parsed from.
+        Only the accounts whose version changed are scanned for transfers,
+        and only the groups they added transfers to or removed transfers
+        from are matched again; the other groups keep their saved ops.
+        Without versions everything is matched and nothing saved. Returns
+        the result and the number of groups that were matched. If verify,
+        also run a full stitch and raise ValueError if they differ.
+        """
+        accounts = list(transactions_by_account)
+        saved = self._load() if versions is not None else {}
+        if list(saved.get('versions', {})) == accounts:
+            groups = saved.get('groups', {})
+            changed = [pos for pos, acct in enumerate(accounts)
+                       if versions.get(acct) is None or
+                       saved['versions'][acct] != versions[acct]]
+        else:
+            # the order of accounts decides the order within groups
+            groups = {}
+            changed = range(len(accounts))
+
+        # the transfers of changed accounts as of the last run, recovered
+        # from the ops, and as they are now
+        before = {pos: defaultdict(list) for pos in changed}
+        for key, flat in groups.items():
+            for pos, index, match_pos, match_index, _ in _ops_of(flat):
+                if pos in before:
+                    before[pos][key].append(index)
+                if match_pos in before:
+                    before[match_pos][key].append(match_index)
+        after = {pos: _transfers(transactions_by_account, accounts[pos]) for pos in changed}
+        affected = set()
+        moved = {}
+        for pos in changed:
+            for key in before[pos].keys() | after[pos].keys():
+                old, new = sorted(before[pos].get(key, ())), after[pos].get(key, [])
+                if len(old) != len(new):
+                    affected.add(key)
+                elif old != new:
+                    moved[pos, key] = dict(zip(old, new))
+
+        # same transfers, new indices: renumber the ops
+        for key in {key for _, key in moved}:
+            flat = groups[key][:]
+            for i in range(0, len(flat), 5):
+                for j in (i, i + 2):
+                    renumber = moved.get((flat[j], key))
+                    if renumber is not None:
+                        flat[j + 1] = renumber[flat[j + 1]]
+            groups[key] = flat
+
+        recomputed = 0
+        for key in affected:
+            flat = groups.pop(key, [])
+            entries = [(pos, index) for op in _ops_of(flat)
+                       for pos, index in (op[:2], op[2:4])
+                       if pos is not None and pos not in after]
+            entries.extend((pos, index) for pos in changed
+                           for index in after[pos].get(key, ()))
+            entries.sort()
+            if not entries:
+                continue
+            recomputed += 1
+            ops = _resolve([(n, accounts[pos], transactions_by_account[accounts[pos]][index])
+                            for n, (pos, index) in enumerate(entries)])
+            groups[key] = list(chain.from_iterable(
+                entries[n] + (entries[match] if match is not None else (None, None)) + (side,)
+                for n, match, side in ops))
+
+        offsets = [0]
+        for ts in transactions_by_account.values():
+            offsets.append(offsets[-1] + len(ts))
+        ops = []
+        for flat in groups.values():
+            for pos, index, match_pos, match_index, side in _ops_of(flat):
+                ops.append((offsets[pos] + index,
+                            None if match_pos is None else offsets[match_pos] + match_index,
+                            side))
+        result = _apply(transactions_by_account, ops)
+        if verify and result != stitch(transactions_by_account):
+            self.clear()
+            raise ValueError('incremental stitch differs from a full stitch')
+        if versions is not None and changed:
+            # json.dumps encodes in C, json.dump does not
+            state = json.dumps({
+                'versions': {acct: versions.get(acct) for acct in accounts},
+                'groups': groups,
+            })
+            with atomic_write(self.path, mode='w', overwrite=True) as f:
+                f.write(state)
+        return result, recomputed
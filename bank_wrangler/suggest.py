@@ -0,0 +1,120 @@
+"""
+Suggest categories for uncategorized transactions.
+
+Distinct descriptions of already-categorized transactions are indexed by
+their features (words, word pairs and, as a fallback, character trigrams)
+in an inverted index. An uncategorized description is compared only with
+the descriptions that share a feature with it, by idf-weighted cosine
+similarity, and its nearest neighbours vote on the category.
+"""
+
+
+from collections import Counter, defaultdict
+from math import log, sqrt
+import heapq
+import re
+from bank_wrangler import schema
+
+
+UNCATEGORIZED = ('', 'Unknown')
+
+# Features in more descriptions than this say little and cost a lot, so
+# they are not used to find candidates.
+MAX_POSTINGS = 100
+
+
+def _words(description):
+    return re.findall('[a-z]+', description.lower())
+
+
+def _word_features(words):
+    return set(words) | {a + ' ' + b for a, b in zip(words, words[1:])}
+
+
+def _trigrams(words):
+    result = set()
+    for word in words:
+        padded = '#' + word + '#'
+        result.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return result
+
+
+class Index:
+    def __init__(self, transactions, neighbours=10):
+        """Index the descriptions of the categorized transactions."""
+        self.neighbours = neighbours
+        categories = defaultdict(Counter)
+        for t in transactions:
+            if t.category not in UNCATEGORIZED:
+                categories[' '.join(_words(schema.describe(t)))][t.category] += 1
+        self.docs = list(categories.values())
+        self.postings = [defaultdict(list), defaultdict(list)]
+        doc_features = []
+        for doc, text in enumerate(categories):
+            words = text.split()
+            features = (_word_features(words), _trigrams(words))
+            for postings, fs in zip(self.postings, features):
+                for f in fs:
+                    postings[f].append(doc)
+            doc_features.append(features)
+        n = len(self.docs) + 1
+        self.idf = [{f: log(n / len(docs)) for f, docs in postings.items()}
+                    for postings in self.postings]
+        self.norms = [[sqrt(sum(idf[f] ** 2 for f in features[level]))
+                       for features in doc_features]
+                      for level, idf in enumerate(self.idf)]
+
+    def _nearest(self, level, features):
+        postings, idf, norms = self.postings[level], self.idf[level], self.norms[level]
+        dots = defaultdict(float)
+        query_norm = 0.0
+        for f in features:
+            weight = idf.get(f)
+            if weight is None:
+                continue
+            query_norm += weight ** 2
+            if len(postings[f]) <= MAX_POSTINGS:
+                for doc in postings[f]:
+                    dots[doc] += weight ** 2
+        if not dots:
+            return []
+        query_norm = sqrt(query_norm)
+        return heapq.nlargest(
+            self.neighbours,
+            ((dot / (query_norm * norms[doc]), doc) for doc, dot in dots.items()))
+
+    def suggest(self, description, k=3):
+        """
+        The top k (category, confidence) suggestions for description, best
+        first. Confidence is in [0, 1]: the category's share of the
+        neighbours' votes times the best neighbour's similarity.
+        """
+        words = _words(description)
+        nearest = (self._nearest(0, _word_features(words)) or
+                   self._nearest(1, _trigrams(words)))
+        if not nearest:
+            return []
+        votes = Counter()
+        for similarity, doc in nearest:
+            counts = self.docs[doc]
+            total = sum(counts.values())
+            for category, count in counts.items():
+                votes[category] += similarity * count / total
+        best = nearest[0][0]
+        total = sum(votes.values())
+        return [(category, best * vote / total)
+                for category, vote in votes.most_common(k)]
+
+
+def suggest_all(transactions, k=3):
+    """
+    Suggestions for every distinct uncategorized description, as a list of
+    (description, number of transactions, suggestions) sorted by how many
+    transactions each description covers.
+    """
+    transactions = list(transactions)
+    index = Index(transactions)
+    pending = Counter(schema.describe(t) for t in transactions
+                      if t.category in UNCATEGORIZED)
+    return [(description, count, index.suggest(description, k))
+            for description, count in pending.most_common()]
@@ -0,0 +1,95 @@
+"""
+Record timed spans of the pipeline stages as Chrome trace-event JSON.
+
+Tracing is off by default and every span is then a no-op. Once enabled,
+each span records its wall time, the peak traced memory while it was open,
+and whatever counters the caller attaches (usually a row count). The
+resulting file loads in chrome://tracing or https://ui.perfetto.dev.
+"""
+
+
+from contextlib import contextmanager
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+
+_events = None
+_stack = []
+
+
+class _Frame:
+    def __init__(self):
+        self.peak = 0
+
+
+def enable():
+    """Start recording spans."""
+    global _events
+    _events = []
+    tracemalloc.start()
+
+
+def enabled():
+    return _events is not None
+
+
+def events():
+    """The events recorded so far."""
+    return list(_events or [])
+
+
+def extend(more_events):
+    """Merge events recorded elsewhere, e.g. by a worker process."""
+    if _events is not None:
+        _events.extend(more_events)
+
+
+@contextmanager
+def span(name, **args):
+    """
+    Time the body as a span called `name`. Yields a dict of trace args the
+    body may add to, e.g. `s['rows'] = len(result)`.
+    """
+    if _events is None:
+        yield args
+        return
+    _, peak = tracemalloc.get_traced_memory()
+    if _stack:
+        _stack[-1].peak = max(_stack[-1].peak, peak)
+    tracemalloc.reset_peak()
+    frame = _Frame()
+    _stack.append(frame)
+    start = time.perf_counter_ns()
+    try:
+        yield args
+    finally:
+        end = time.perf_counter_ns()
+        _, peak = tracemalloc.get_traced_memory()
+        frame.peak = max(frame.peak, peak)
+        _stack.pop()
+        if _stack:
+            _stack[-1].peak = max(_stack[-1].peak, frame.peak)
+        args['peak_memory_bytes'] = frame.peak
+        _events.append({
+            'name': name,
+            'cat': 'bank_wrangler',
+            'ph': 'X',
+            'ts': start / 1000,
+            'dur': (end - start) / 1000,
+            'pid': os.getpid(),
+            'tid': threading.get_ident(),
+            'args': args,
+        })
+
+
+def write(path):
+    """Write the recorded events to `path` and stop recording."""
+    global _events
+    with open(path, 'w') as f:
+        json.dump({'traceEvents': _events or [], 'displayTimeUnit': 'ms'},
+                  f, default=str)
+    _events = None
+    tracemalloc.stop()
@@ -0,0 +1,181 @@
+"""
+Keep the pipeline in memory and regenerate the report as inputs change.
+
+Parsed data files and pre_stitch results are cached per bank, so a changed
+data file only reparses that bank, and a changed rules.py reruns the rules
+without reparsing anything. Only report files whose contents changed are
+rewritten.
+"""
+
+
+from select import select
+import ctypes
+import ctypes.util
+import os
+import struct
+import sys
+import time
+import traceback
+from bank_wrangler import snapshot, stitch, report, trace
+from bank_wrangler.banks import BankInstance
+from bank_wrangler.rules import Rules
+
+
+# Events are gathered for this long after the first one, since editors and
+# atomic writes often produce several in a row.
+SETTLE_SECONDS = 0.02
+
+
+class _Inotify:
+    """Reports files created, written or moved into a directory (Linux)."""
+
+    _IN_CLOSE_WRITE = 0x008
+    _IN_MOVED_TO = 0x080
+    _event = struct.Struct('iIII')
+
+    def __init__(self, directory):
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.fd = libc.inotify_init1(os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        mask = self._IN_CLOSE_WRITE | self._IN_MOVED_TO
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), mask) < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_add_watch failed')
+
+    def _read(self, timeout):
+        names = set()
+        while select([self.fd], [], [], timeout)[0]:
+            buf = os.read(self.fd, 64 * 1024)
+            i = 0
+            while i < len(buf):
+                _, _, _, length = self._event.unpack_from(buf, i)
+                i += self._event.size
+                names.add(os.fsdecode(buf[i:i + length].rstrip(b'\0')))
+                i += length
+            timeout = SETTLE_SECONDS
+        return names
+
+    def wait(self):
+        """Block until something changes, then return the changed names."""
+        return self._read(None)
+
+
+class _Poller:
+    """Fallback for platforms without inotify: compares mtimes."""
+
+    def __init__(self, directory, interval=0.5):
+        self.directory = directory
+        self.interval = interval
+        self.mtimes = self._scan()
+
+    def _scan(self):
+        result = {}
+        for entry in os.scandir(self.directory):
+            if entry.is_file():
+                result[entry.name] = entry.stat().st_mtime_ns
+        return result
+
+    def wait(self):
+        while True:
+            time.sleep(self.interval)
+            mtimes = self._scan()
+            names = {name for name, mtime in mtimes.items()
+                     if self.mtimes.get(name) != mtime}
+            self.mtimes = mtimes
+            if names:
+                return names
+
+
+class Watcher:
+    def __init__(self, root, bank_names, data_key=None):
+        """
+        bank_names maps each config key to its bank type's name. data_key
+        decrypts encrypted data files.
+        """
+        self.root = root
+        self.bank_names = bank_names
+        self.data_key = data_key
+        self.rules = None
+        self.rules_stale = True
+        self.parsed = {}   # key -> {account: [Transaction]} as parsed
+        self.sources = {}  # key -> the data file it was parsed from
+        self.pre = {}      # account -> [Transaction] after pre_stitch
+        self.files = None  # the report files last written
+
+    def update(self, names):
+        """
+        Recompute what depends on the changed file names and rewrite the
+        report files that changed. Returns the names of files written.
+        """
+        rules_changed = self.rules_stale or 'rules.py' in names
+        rules = self.rules
+        if rules_changed:
+            # stays set until the new rules have been applied everywhere
+            self.rules_stale = True
+            rules = Rules(self.root).get_module()
+        # nothing is kept unless the whole update succeeds, so a failure
+        # leaves the cache as it was and the next update redoes its work
+        parsed = dict(self.parsed)
+        sources = dict(self.sources)
+        redo = set()
+        with snapshot.reader(self.root) as s:
+            for key, bank_name in self.bank_names.items():
+                path = s.path(key + '.data')
+                if (key in parsed and sources[key] == path and
+                        key + '.data' not in names):
+                    continue
+                instance = BankInstance(self.root, key, bank_name, self.data_key)
+                parsed[key] = instance.transactions_by_account(path)
+                sources[key] = path
+                redo.update(parsed[key])
+
+        pre = {}
+        for key in self.bank_names:
+            for account, ts in parsed[key].items():
+                if account in pre:
+                    raise ValueError('account {} defined more than once'.format(account))
+                if rules_changed or account in redo or account not in self.pre:
+                    with trace.span('pre_stitch', account=account):
+                        pre[account] = list(map(rules.pre_stitch, ts))
+                else:
+                    pre[account] = self.pre[account]
+        with trace.span('stitch'):
+            transactions = stitch.stitch(pre)
+        with trace.span('post_stitch'):
+            transactions = list(map(rules.post_stitch, transactions))
+        files = report.render(transactions, list(pre))
+        written = report.write(self.root, files, self.files)
+        self.rules = rules
+        self.rules_stale = False
+        self.parsed = parsed
+        self.sources = sources
+        self.pre = pre
+        self.files = files
+        return written
+
+
+def watch(root, bank_names, data_key=None):
+    """Generate the report, then regenerate it whenever an input changes."""
+    try:
+        changes = _Inotify(root)
+    except (OSError, AttributeError):
+        changes = _Poller(root)
+    # fetches publish data files by replacing the snapshot manifest
+    watched = ({'rules.py', snapshot.MANIFEST} |
+               {key + '.data' for key in bank_names})
+    watcher = Watcher(root, bank_names, data_key)
+    names = watched
+    while True:
+        start = time.perf_counter()
+        try:
+            written = watcher.update(names)
+        except Exception:
+            # keep watching; the next save will likely fix it
+            traceback.print_exc()
+        else:
+            ms = 1000 * (time.perf_counter() - start)
+            print(f'report updated: {len(written)} files written in {ms:.0f} ms')
+        sys.stdout.flush()
+        names = set()
+        while not names:
+            names = changes.wait() & watched
@@ -0,0 +1,58 @@
+"""
+Benchmark compressed data files against plain ones.
+
+    python -m benchmarks.bench_compress [ROWS...]
+
+Writes the fake bank's Venmo history, Fidelity OFX response and Fidelity
+Visa download as plain, gzip and (if zstandard is installed) zstd data
+files, and reports the size of each and the time to parse it, which
+includes decompressing it as it is read.
+"""
+
+
+import os
+import sys
+import tempfile
+import time
+from bank_wrangler import datafile, fakebank
+from bank_wrangler.bank import fidelity, fidelity_visa, venmo
+
+
+def _texts(rows):
+    yield 'venmo', venmo, rows, 'me\n' + fakebank.venmo_history('me', rows)
+    # OFX responses cover three months, and ofxtools parses slowly
+    yield 'fidelity', fidelity, rows // 10, fakebank.ofx_response(['111'], rows // 10)
+    yield ('fidelity visa', fidelity_visa, rows,
+           'Fidelity Visa 1234\n0\n' + fakebank.visa_csv('1234', rows))
+
+
+def _parse(path, bank):
+    start = time.perf_counter()
+    with datafile.open_text(path) as f:
+        bank.transactions_by_account(f)
+    return time.perf_counter() - start
+
+
+def main(sizes):
+    compressions = [None, 'gzip'] + (['zstd'] if datafile.zstandard else [])
+    print('{:>14}  {:>8}  {:>6}  {:>10}  {:>6}  {:>9}'.format(
+        'bank', 'rows', 'format', 'bytes', 'ratio', 'parse (s)'))
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, 'a.data')
+        for n in sizes:
+            for name, bank, rows, text in _texts(n):
+                plain_size = None
+                for compression in compressions:
+                    with open(path, 'wb') as f:
+                        with datafile.text_writer(f, compression=compression) as writer:
+                            writer.write(text)
+                    size = os.path.getsize(path)
+                    plain_size = plain_size or size
+                    parse_s = min(_parse(path, bank) for _ in range(3))
+                    print('{:>14}  {:>8}  {:>6}  {:>10}  {:>6.1f}  {:>9.3f}'.format(
+                        name, rows, compression or 'plain', size,
+                        plain_size / size, parse_s))
+
+
+if __name__ == '__main__':
+    main([int(n) for n in sys.argv[1:]] or [10000, 100000])
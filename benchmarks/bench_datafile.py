@@ -0,0 +1,63 @@
+"""
+Benchmark parsing encrypted data files against plain ones.
+
+    python -m benchmarks.bench_datafile [ROWS...]
+
+Parses a Fidelity Visa data file of the fake bank's transactions, plain and
+encrypted, and reports how much decryption adds to the parse stage. It
+should stay within a few percent. The raw decryption throughput is shown
+for reference.
+"""
+
+
+import os
+import sys
+import tempfile
+import time
+from bank_wrangler import datafile, fakebank
+from bank_wrangler.bank import fidelity_visa
+
+
+def _parse(path, key):
+    start = time.perf_counter()
+    with datafile.open_text(path, key) as f:
+        fidelity_visa.transactions_by_account(f)
+    return time.perf_counter() - start
+
+
+def _decrypt(path, key):
+    start = time.perf_counter()
+    with datafile.open_text(path, key) as f:
+        while f.buffer.read(1 << 20):
+            pass
+    return time.perf_counter() - start
+
+
+def main(sizes):
+    key = os.urandom(32)
+    print('{:>10}  {:>10}  {:>10}  {:>9}  {:>12}'.format(
+        'rows', 'plain (s)', 'enc (s)', 'overhead', 'decrypt MB/s'))
+    with tempfile.TemporaryDirectory() as root:
+        plain = os.path.join(root, 'plain.data')
+        encrypted = os.path.join(root, 'encrypted.data')
+        for rows in sizes:
+            text = 'Fidelity Visa 1234\n0\n' + fakebank.visa_csv('1234', rows)
+            with open(plain, 'w') as f:
+                f.write(text)
+            with open(encrypted, 'wb') as f:
+                with datafile.text_writer(f, key) as writer:
+                    writer.write(text)
+            # interleaved best of five, to keep noise out of the comparison
+            plain_s, encrypted_s = float('inf'), float('inf')
+            for _ in range(5):
+                plain_s = min(plain_s, _parse(plain, None))
+                encrypted_s = min(encrypted_s, _parse(encrypted, key))
+            decrypt_s = min(_decrypt(encrypted, key) for _ in range(5))
+            print('{:>10}  {:>10.3f}  {:>10.3f}  {:>8.1f}%  {:>12.0f}'.format(
+                rows, plain_s, encrypted_s,
+                100 * (encrypted_s - plain_s) / plain_s,
+                len(text) / 1e6 / decrypt_s))
+
+
+if __name__ == '__main__':
+    main([int(n) for n in sys.argv[1:]] or [10000, 100000, 500000])
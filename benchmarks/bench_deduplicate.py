@@ -0,0 +1,61 @@
+"""
+Benchmark deduplicate and merge_windows on synthetic histories.
+
+    python -m benchmarks.bench_deduplicate [ROWS...]
+
+Running time should grow linearly with the number of rows.
+"""
+
+
+from decimal import Decimal
+import random
+import sys
+import time
+from bank_wrangler import schema
+from bank_wrangler.deduplicate import Reported, deduplicate, merge_windows
+
+
+def _reports(rows, seed=0):
+    rng = random.Random(seed)
+    banks = {f'bank{i}': [f'account{i}'] for i in range(8)}
+    accounts = [a for accts in banks.values() for a in accts]
+    owner = {a: b for b, accts in banks.items() for a in accts}
+    result = []
+    while len(result) < rows:
+        date = schema.Date(rng.randint(2010, 2019), rng.randint(1, 12), rng.randint(1, 28))
+        amount = Decimal(rng.randint(1, 100000)).scaleb(-2)
+        src = rng.choice(accounts)
+        if rng.random() < 0.3:
+            dst = rng.choice(accounts)
+            if dst == src:
+                continue
+            # both sides report the transfer
+            result.append(Reported(owner[src], src, dst, date, 'out', amount))
+            result.append(Reported(owner[dst], src, dst, date, 'in', amount))
+        else:
+            result.append(Reported(owner[src], src, '', date, 'shop', amount))
+    rng.shuffle(result)
+    return result[:rows], banks
+
+
+def _time(f, *args):
+    start = time.perf_counter()
+    f(*args)
+    return time.perf_counter() - start
+
+
+def main(sizes):
+    print('{:>10}  {:>12}  {:>12}  {:>12}'.format(
+        'rows', 'dedup (s)', 'windows (s)', 'us/row'))
+    for rows in sizes:
+        reports, banks = _reports(rows)
+        dedup = _time(deduplicate, reports, banks)
+        half = len(reports) // 2
+        windows = _time(merge_windows, reports[:half + rows // 10],
+                        reports[half - rows // 10:])
+        print('{:>10}  {:>12.3f}  {:>12.3f}  {:>12.2f}'.format(
+            rows, dedup, windows, 1e6 * dedup / rows))
+
+
+if __name__ == '__main__':
+    main([int(n) for n in sys.argv[1:]] or [10000, 100000, 1000000])
@@ -0,0 +1,128 @@
+"""
+Benchmark fetching and parsing against the local fake bank server.
+
+    python -m benchmarks.bench_fetch [--banks N] [--rows N] [--latency S]
+        [--fail-rate P] [--retries N] [--concurrency N] [--browsers]
+
+Each bank instance is fetched into a temporary root the same way fetch-all
+does, first one at a time and then --concurrency at a time, retrying
+failed requests up to --retries times, and the results are then parsed.
+Only the OFX backend is used unless --browsers is given, since the others
+drive Firefox. With --browsers, the browser backends are then fetched once
+under each browser policy and their page load times compared.
+"""
+
+
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import tempfile
+import time
+from bank_wrangler import fakebank, trace
+from bank_wrangler.bank import common
+from bank_wrangler.banks import BankInstance, parse
+from bank_wrangler.config import Config, ConfigField
+from bank_wrangler.rules import Rules
+
+
+def _configs(banks, browsers):
+    result = {}
+    for i in range(banks):
+        result[f'fidelity{i}'] = Config('Fidelity', [
+            ConfigField(False, 'Username', 'user'),
+            ConfigField(True, 'Password', 'password'),
+            ConfigField(False, 'Account IDs (Comma Delimited)', f'X{i}A,X{i}B'),
+        ])
+    if browsers:
+        result['venmo'] = Config('Venmo', [
+            ConfigField(False, 'Username (no email/phone)', fakebank.VENMO_USER),
+            ConfigField(True, 'Password', 'password'),
+        ])
+        result['visa'] = Config('Fidelity Visa', [
+            ConfigField(False, 'Username', 'user'),
+            ConfigField(True, 'Password', 'password'),
+            ConfigField(False, 'Last Four Digits of Credit Card Number', '1234'),
+        ])
+    return result
+
+
+def _fetch_one(root, key, config, retries):
+    """Fetch one bank instance, returning how many attempts failed."""
+    for attempt in range(retries + 1):
+        try:
+            BankInstance(root, key, config.bank).fetch(config.fields)
+            return attempt
+        except Exception:
+            if attempt == retries:
+                raise
+
+
+def _fetch_all(root, configs, retries, concurrency):
+    with ThreadPoolExecutor(concurrency) as pool:
+        futures = [pool.submit(_fetch_one, root, key, config, retries)
+                   for key, config in configs.items()]
+        return sum(f.result() for f in futures)
+
+
+def _page_loads(root, configs, retries):
+    """Fetch the browser backends under each policy, printing page loads."""
+    browsers = {key: c for key, c in configs.items() if c.bank != 'Fidelity'}
+    print()
+    print('{:<24}  {:<28}  {:>8}  {:>8}'.format('policy', 'page', 'load ms', 'wall ms'))
+    for policy in common.POLICIES.values():
+        # headless either way, so only the blocking differs
+        common.override_policy(policy._replace(headless=True))
+        trace.enable()
+        _fetch_all(root, browsers, retries, 1)
+        for event in trace.events():
+            if event['name'] == 'page load':
+                page = event['args']['url'].split('/', 3)[-1].split('?')[0]
+                load_ms = event['args']['load_ms']
+                print('{:<24}  {:<28}  {:>8}  {:>8.0f}'.format(
+                    policy.name, '/' + page,
+                    '-' if load_ms is None else f'{load_ms:.0f}',
+                    event['dur'] / 1000))
+    common.override_policy(None)
+
+
+def _time(f, *args):
+    start = time.perf_counter()
+    result = f(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--banks', type=int, default=8)
+    parser.add_argument('--rows', type=int, default=2000)
+    parser.add_argument('--latency', type=float, default=0.1)
+    parser.add_argument('--fail-rate', type=float, default=0.0)
+    parser.add_argument('--retries', type=int, default=3)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--browsers', action='store_true')
+    args = parser.parse_args()
+
+    server = fakebank.serve(rows=args.rows, latency=args.latency,
+                            fail_rate=args.fail_rate)
+    fakebank.patch_backends(f'http://127.0.0.1:{server.server_port}')
+    configs = _configs(args.banks, args.browsers)
+
+    print('{:>12}  {:>10}  {:>8}'.format('step', 'time (s)', 'retries'))
+    with tempfile.TemporaryDirectory() as root:
+        Rules(root).write_boilerplate()
+        for label, concurrency in [('sequential', 1),
+                                   ('concurrent', args.concurrency)]:
+            seconds, retried = _time(_fetch_all, root, configs, args.retries,
+                                     concurrency)
+            print('{:>12}  {:>10.3f}  {:>8}'.format(label, seconds, retried))
+        seconds, results = _time(
+            lambda: [parse(root, key, c.bank) for key, c in configs.items()])
+        rows = sum(len(ts) for r, _ in results for ts in r.values())
+        print('{:>12}  {:>10.3f}  {:>8}'.format('parse', seconds, '-'))
+        print(f'{rows} transactions from {len(configs)} banks')
+        if args.browsers:
+            _page_loads(root, configs, args.retries)
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
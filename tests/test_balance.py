@@ -0,0 +1,47 @@
+from decimal import Decimal
+from nose.tools import assert_equals
+from bank_wrangler import schema
+from bank_wrangler.balance import BalanceIndex
+from bank_wrangler.bank.common import correct_balance
+
+
+def _transactions():
+    return [
+        schema.Transaction('', 'checking', schema.Date(2017, 1, 1),
+                           'paycheck', Decimal('100.00')),
+        schema.Transaction('checking', 'savings', schema.Date(2017, 1, 5),
+                           'transfer', Decimal('40.00')),
+        schema.Transaction('checking', '', schema.Date(2017, 1, 5),
+                           'groceries', Decimal('10.01')),
+        schema.Transaction('', 'checking', schema.Date(2017, 2, 1),
+                           'paycheck', Decimal('100.00')),
+    ]
+
+
+def test_balance_as_of():
+    index = BalanceIndex(_transactions())
+    assert_equals(index.balance('checking', schema.Date(2016, 12, 31)), Decimal('0'))
+    assert_equals(index.balance('checking', schema.Date(2017, 1, 1)), Decimal('100.00'))
+    assert_equals(index.balance('checking', schema.Date(2017, 1, 20)), Decimal('49.99'))
+    assert_equals(index.balance('checking'), Decimal('149.99'))
+    assert_equals(index.balance('savings'), Decimal('40.00'))
+    assert_equals(index.balance('nonexistent'), Decimal('0'))
+
+
+def test_net_flow():
+    index = BalanceIndex(_transactions())
+    assert_equals(
+        index.net_flow('checking', schema.Date(2017, 1, 5), schema.Date(2017, 2, 1)),
+        Decimal('49.99'))
+    assert_equals(
+        index.net_flow('checking', schema.Date(2017, 1, 2), schema.Date(2017, 1, 4)),
+        Decimal('0'))
+
+
+def test_correct_balance():
+    for real in [Decimal('200.00'), Decimal('100.00'), Decimal('149.99')]:
+        transactions = _transactions()
+        correct_balance('checking', real, transactions)
+        assert_equals(BalanceIndex(transactions).balance('checking'), real)
+        assert_equals(len(transactions), 4 if real == Decimal('149.99') else 5)
+    assert_equals(transactions[-1:], _transactions()[-1:])
@@ -0,0 +1,59 @@
+import os
+import tempfile
+from nose.tools import assert_equals
+from bank_wrangler import datafile
+from bank_wrangler.banks import BankInstance, FetchCheckpoint, recorded_bank
+
+
+class _FakeBank:
+    @staticmethod
+    def name():
+        return 'Venmo'
+
+    @staticmethod
+    def fetch(fields, fileobj):
+        fileobj.write('hello\n')
+
+
+def _instance(root, key):
+    instance = BankInstance(root, key, 'Venmo')
+    instance.bank = _FakeBank
+    return instance
+
+
+def test_fetch_records_metadata():
+    with tempfile.TemporaryDirectory() as root:
+        instance = _instance(root, 'venmo')
+        assert_equals(instance.metadata(), {})
+        assert_equals(instance.age(), None)
+        instance.fetch([])
+        metadata = instance.metadata()
+        # stored compressed
+        assert_equals(metadata['bytes'], os.path.getsize(instance.path))
+        with datafile.open_text(instance.path) as f:
+            assert_equals(f.read(), 'hello\n')
+        assert_equals(recorded_bank(root, 'venmo'), 'Venmo')
+        assert metadata['duration'] >= 0
+        age = instance.age(now=metadata['last_success'] + 60)
+        assert_equals(age, 60)
+        os.remove(instance.path)
+        assert_equals(instance.age(), None)
+
+
+def test_record_bank():
+    with tempfile.TemporaryDirectory() as root:
+        assert_equals(recorded_bank(root, 'venmo'), None)
+        _instance(root, 'venmo').record_bank()
+        assert_equals(recorded_bank(root, 'venmo'), 'Venmo')
+        assert_equals(_instance(root, 'venmo').age(), None)
+
+
+def test_checkpoint():
+    with tempfile.TemporaryDirectory() as root:
+        checkpoint = FetchCheckpoint(root)
+        assert_equals(checkpoint.done(), set())
+        checkpoint.add('a')
+        checkpoint.add('b')
+        assert_equals(FetchCheckpoint(root).done(), {'a', 'b'})
+        checkpoint.clear()
+        assert_equals(checkpoint.done(), set())
@@ -0,0 +1,51 @@
+import os
+import tempfile
+from nose.tools import assert_equals
+from bank_wrangler import trace
+from bank_wrangler.bank.common import FULL, LEAN, load_page
+
+
+class _Profile:
+    def __init__(self):
+        self.preferences = {}
+
+    def set_preference(self, key, value):
+        self.preferences[key] = value
+
+
+def test_lean_blocks():
+    profile = _Profile()
+    LEAN.apply(profile)
+    assert_equals(profile.preferences['permissions.default.image'], 2)
+    assert_equals(profile.preferences['gfx.downloadable_fonts.enabled'], False)
+    assert profile.preferences['privacy.trackingprotection.enabled']
+    assert '-headless' in LEAN.options().arguments
+
+
+def test_full_loads_everything():
+    profile = _Profile()
+    FULL.apply(profile)
+    assert_equals(profile.preferences, {})
+    assert '-headless' not in FULL.options().arguments
+
+
+class _Driver:
+    """Reports the load event as unfinished on the first check."""
+
+    def __init__(self):
+        self.results = [None, 123.5]
+
+    def get(self, url):
+        self.url = url
+
+    def execute_script(self, script):
+        return self.results.pop(0)
+
+
+def test_load_page_waits_for_load_event():
+    trace.enable()
+    load_page(_Driver(), 'http://bank.test/login')
+    events = trace.events()
+    with tempfile.TemporaryDirectory() as root:
+        trace.write(os.path.join(root, 'trace.json'))
+    assert_equals(events[0]['args']['load_ms'], 123.5)
@@ -0,0 +1,70 @@
+from decimal import Decimal
+import os
+import tempfile
+from click.testing import CliRunner
+from nose.tools import assert_equals
+from bank_wrangler import budget, schema, snapshot
+from bank_wrangler.bank_wrangler import _inputs, cli
+from bank_wrangler.config import Vault
+from bank_wrangler.database import Database
+from bank_wrangler.rules import Rules
+
+
+def test_month_overrides_default():
+    with tempfile.TemporaryDirectory() as root:
+        budgets = budget.Budgets(root)
+        budgets.set('Food', Decimal('400'))
+        budgets.set('Food', Decimal('600'), '2017/12')
+        budgets.set('Fun', Decimal('50'))
+        budgets.set('Fun', None)
+        assert_equals(budgets.for_month('2017/11'), {'Food': Decimal('400')})
+        assert_equals(budgets.for_month('2017/12'), {'Food': Decimal('600')})
+
+
+def test_status_threshold():
+    budgets = {'Food': Decimal('400'), 'Rent': Decimal('1000'),
+               'Fun': Decimal('0')}
+    spent = {'Food': Decimal('380'), 'Rent': Decimal('1000'),
+             'Other': Decimal('99')}
+    statuses = budget.status(budgets, spent, threshold=0.9)
+    assert_equals([(s.category, s.remaining, s.crossed) for s in statuses], [
+        ('Food', Decimal('20'), True),
+        ('Fun', Decimal('0'), False),
+        ('Rent', Decimal('0'), True),
+    ])
+    assert_equals([s.crossed for s in budget.status(budgets, spent)],
+                  [False, False, True])
+
+
+def test_budget_command():
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        root = os.getcwd()
+        Rules(root).write_boilerplate()
+        Vault(root).write_empty('passphrase')
+        with snapshot.reader(root) as s:
+            inputs = _inputs(root, s, [])
+        # synced with the current inputs, so budget does not sync again
+        Database(root).sync([schema.Transaction(
+            'checking', '', schema.Date(2017, 3, 1), 'groceries',
+            Decimal('50.00'), 'Food')], inputs)
+
+        for amount in ['nan', 'Infinity', '-5', 'lots']:
+            result = runner.invoke(cli, ['budget', 'set', '--', 'Food', amount])
+            assert_equals(result.exit_code, 1, amount)
+            assert 'fatal: not an amount' in result.output
+        result = runner.invoke(cli, ['budget', 'set', 'Food', '40',
+                                     '--month', '2017/13'])
+        assert_equals(result.exit_code, 2)
+        assert_equals(budget.Budgets(root).get_all(), {})
+
+        result = runner.invoke(cli, ['budget', 'set', 'Food', '100'])
+        assert_equals(result.exit_code, 0, result.output)
+        result = runner.invoke(cli, ['budget', '--month', '2017-03'])
+        assert_equals(result.exit_code, 0, result.output)
+        assert 'budgets for 2017/03' in result.output
+
+        runner.invoke(cli, ['budget', 'set', 'Food', '40', '--month', '2017/03'])
+        result = runner.invoke(cli, ['budget', '--month', '2017/03'])
+        assert_equals(result.exit_code, 1)
+        assert 'crossed' in result.output
@@ -0,0 +1,61 @@
+import gzip
+import os
+import tempfile
+from nose.tools import assert_equals
+from bank_wrangler import report
+from bank_wrangler.report import bundle
+
+
+def test_minify_js():
+    source = '''/**
+ * Doc comment.
+ */
+const f = function f(s) {
+    // split on slashes
+    return s.split('/*not a comment*/' + "//nor this");
+}
+'''
+    assert_equals(bundle.minify_js(source),
+                  "const f = function f(s) {\n"
+                  "return s.split('/*not a comment*/' + \"//nor this\");\n"
+                  "}")
+
+
+def test_minify_css():
+    assert_equals(bundle.minify_css('/* c */\n.a ,\n.b {\n  color: red ;\n}\n'),
+                  '.a,.b{color: red;}')
+
+
+def test_pages_get_only_their_assets():
+    with tempfile.TemporaryDirectory() as reportdir:
+        os.mkdir(os.path.join(reportdir, 'libs'))
+        os.mkdir(os.path.join(reportdir, 'js'))
+        for name in ('pure-min.css', 'datatables.min.js', 'Chart.bundle.min.js'):
+            with open(os.path.join(reportdir, 'libs', name), 'w') as f:
+                f.write(f'/* {name} */')
+        with open(os.path.join(reportdir, 'js', 'spending.js'), 'w') as f:
+            f.write('// spending\nspend();\n')
+        files, imports = bundle.bundles(reportdir)
+
+        assert_equals(imports['index.html']['jsimports'], [])
+        assert_equals(imports['list.html']['jsimports'][1], 'data.js')
+        list_js = files[imports['list.html']['jsimports'][0]]
+        spending_js = files[imports['spending.html']['jsimports'][0]]
+        assert 'datatables' in list_js and 'Chart' not in list_js
+        assert 'Chart' in spending_js and 'spend();' in spending_js
+        assert '// spending' not in spending_js
+        # the same stylesheet is shared, not duplicated per page
+        css = {imports[page]['cssimports'][0] for page in bundle.PAGES}
+        assert_equals(len(css), 1)
+
+
+def test_write_precompressed():
+    with tempfile.TemporaryDirectory() as root:
+        report.write(root, {'a.js': 'one', 'b.js': 'two'})
+        path = os.path.join(root, 'report', 'a.js')
+        with gzip.open(path + '.gz', 'rt') as f:
+            assert_equals(f.read(), 'one')
+        report.write(root, {'b.js': 'two'}, {'a.js': 'one', 'b.js': 'two'})
+        assert_equals(sorted(name for name in os.listdir(os.path.join(root, 'report'))
+                             if not name.endswith('.br')),
+                      ['b.js', 'b.js.gz'])
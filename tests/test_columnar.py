@@ -0,0 +1,73 @@
+from decimal import Decimal
+import os
+import tempfile
+from nose.tools import assert_equals
+from bank_wrangler import schema, columnar
+
+
+def test_write_header():
+    transactions = [
+        schema.Transaction('checking', '', schema.Date(1970, 1, 2),
+                           'coffee', Decimal('3.50'), 'Food'),
+        schema.Transaction('', 'checking', schema.Date(1970, 1, 3),
+                           'paycheck', Decimal('100'), 'Income'),
+    ]
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, 'export.bwc')
+        assert_equals(columnar.write(path, transactions), 2)
+        header = columnar.read_header(path)
+    assert_equals(header['rows'], 2)
+    assert_equals([c['name'] for c in header['columns']],
+                  ['date', 'amount', 'source', 'to', 'description', 'category'])
+    for column in header['columns']:
+        for block in [column, column.get('codes'), column.get('offsets'),
+                      column.get('data')]:
+            if block is not None and 'offset' in block:
+                assert_equals(block['offset'] % 8, 0)
+
+
+def _roundtrip(transactions):
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, 'export.bwc')
+        columnar.write(path, transactions)
+        columns = columnar.load(path)
+        result = {}
+        for name, column in columns.items():
+            if isinstance(column, columnar.Strings):
+                result[name] = [column.dictionary[code] for code in column.codes]
+            else:
+                result[name] = column.tolist()
+        return result, columns
+
+
+def test_load_roundtrip():
+    transactions = [
+        schema.Transaction('checking', '', schema.Date(1970, 1, 2),
+                           'café', Decimal('3.50'), 'Food'),
+        schema.Transaction('', 'checking', schema.Date(2017, 3, 1),
+                           'paycheck', Decimal('-100'), 'Income'),
+        schema.Transaction('checking', '', schema.Date(2017, 3, 2),
+                           'café', Decimal('0.01'), 'Food'),
+        # sub-cent amounts, as in OFX, round as in the database index
+        schema.Transaction('checking', '', schema.Date(2017, 3, 3),
+                           'shares', Decimal('12.3456'), 'Invest'),
+    ]
+    result, columns = _roundtrip(transactions)
+    assert_equals(result['amount'], [350, -10000, 1, 1235])
+    assert_equals([str(d) for d in result['date']],
+                  ['1970-01-02', '2017-03-01', '2017-03-02', '2017-03-03'])
+    assert_equals(result['source'], ['checking', '', 'checking', 'checking'])
+    assert_equals(result['to'], ['', 'checking', '', ''])
+    assert_equals(result['description'], ['café', 'paycheck', 'café', 'shares'])
+    assert_equals(result['category'], ['Food', 'Income', 'Food', 'Invest'])
+    dictionary = columns['description'].dictionary
+    assert_equals(list(dictionary), ['café', 'paycheck', 'shares'])
+    assert_equals(dictionary[-1], 'shares')
+
+
+def test_load_empty():
+    result, columns = _roundtrip([])
+    assert_equals(result, {name: [] for name in
+                           ['date', 'amount', 'source', 'to', 'description',
+                            'category']})
+    assert_equals(len(columns['source'].dictionary), 0)
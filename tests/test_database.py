@@ -0,0 +1,97 @@
+from contextlib import closing
+from decimal import Decimal
+import os
+import sqlite3
+import tempfile
+from click.testing import CliRunner
+from nose.tools import assert_equals
+from bank_wrangler import schema, snapshot
+from bank_wrangler.bank_wrangler import _inputs, cli
+from bank_wrangler.config import Vault
+from bank_wrangler.database import Database
+from bank_wrangler.rules import Rules
+
+
+def _transaction(description, amount, category='Unknown'):
+    return schema.Transaction('checking', '', schema.Date(2017, 3, 1),
+                              description, Decimal(amount), category)
+
+
+def test_sync_incremental():
+    a = _transaction('coffee', '3.50', 'Food')
+    b = _transaction('rent', '1000.00', 'Housing')
+    with tempfile.TemporaryDirectory() as root:
+        database = Database(root)
+        assert_equals(database.sync([a, a, b]), (3, 0))
+        assert_equals(database.sync([a, a, b]), (0, 0))
+        assert_equals(database.sync([a, b, b]), (1, 1))
+        _, rows = database.query(group_by=['category'])
+        assert_equals(rows, [('Food', 1, Decimal('3.50')),
+                             ('Housing', 2, Decimal('2000.00'))])
+
+
+def test_query_filters():
+    with tempfile.TemporaryDirectory() as root:
+        database = Database(root)
+        database.sync([_transaction('coffee', '3.50'),
+                       _transaction('more coffee', '4.50'),
+                       _transaction('tea', '4.00')])
+        _, rows = database.query(description='coffee', min_amount='4')
+        assert_equals([row[3] for row in rows], ['more coffee'])
+
+
+def test_monthly_incremental_matches_backfill():
+    def t(source, to, day, amount, category):
+        return schema.Transaction(source, to, schema.Date(2017, 3, day),
+                                  'x', Decimal(amount), category)
+    groceries = t('checking', '', 1, '50.00', 'Food')
+    refund = t('', 'checking', 2, '5.00', 'Food')
+    transfer = t('checking', 'savings', 3, '100.00', 'Transfer')
+    card = t('visa', '', 4, '20.00', 'Food')
+    with tempfile.TemporaryDirectory() as root:
+        database = Database(root)
+        database.sync([groceries, groceries, refund, transfer])
+        database.sync([groceries, refund, transfer, card])
+        assert_equals(database.monthly('2017/03'), {
+            'Food': (3, Decimal('70.00'), Decimal('5.00')),
+        })
+        assert_equals(database.monthly('2017/03', ['visa']), {
+            'Food': (1, Decimal('20.00'), Decimal('0.00')),
+        })
+        with closing(sqlite3.connect(database.path)) as conn:
+            incremental = sorted(conn.execute('SELECT * FROM monthly'))
+            conn.execute('PRAGMA user_version = 0')
+            conn.commit()
+        with closing(database._connect()) as conn:
+            assert_equals(sorted(conn.execute('SELECT * FROM monthly')),
+                          incremental)
+        database.sync([])
+        assert_equals(database.monthly('2017/03'), {})
+
+
+def test_query_command_syncs_when_stale():
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        root = os.getcwd()
+        Rules(root).write_boilerplate()
+        Vault(root).write_empty('passphrase')
+        database = Database(root)
+        with snapshot.reader(root) as s:
+            database.sync([_transaction('coffee', '3.50')], _inputs(root, s, []))
+
+        result = runner.invoke(cli, ['query', '--min-amount', '3'])
+        assert_equals(result.exit_code, 0, result.output)
+        assert 'index updated' not in result.output
+        assert 'coffee' in result.output
+        for bad in ['lots', 'nan', 'Infinity']:
+            result = runner.invoke(cli, ['query', '--max-amount', bad])
+            assert_equals(result.exit_code, 2, bad)
+            assert '--max-amount' in result.output
+
+        # a changed rules.py makes the next query sync (to no transactions)
+        with open(Rules(root).path, 'a') as f:
+            f.write('\n')
+        result = runner.invoke(cli, ['query'])
+        assert 'index updated: 0 added, 1 removed' in result.output
+        result = runner.invoke(cli, ['query'])
+        assert 'index updated' not in result.output
@@ -0,0 +1,127 @@
+import os
+import tempfile
+from nose.tools import assert_equals, assert_raises
+from bank_wrangler import datafile
+from bank_wrangler.bank_wrangler import _data_key
+
+
+KEY = bytes(range(32))
+
+
+def _write(path, text, chunk_size):
+    with open(path, 'wb') as f:
+        with datafile.text_writer(f, KEY, chunk_size) as writer:
+            writer.write(text)
+
+
+def _read(path):
+    with datafile.open_text(path, KEY) as f:
+        return f.read()
+
+
+def test_roundtrip():
+    text = ''.join(f'line {i}\n' for i in range(1000))
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, 'a.data')
+        for size in [len(text), len(text) - 1, 7, 1]:
+            _write(path, text, size)
+            assert datafile.is_encrypted(path)
+            with datafile.open_text(path, KEY) as f:
+                assert_equals(f.readline(), 'line 0\n')
+                assert_equals(f.read(), text[len('line 0\n'):])
+
+
+def test_empty_and_plain():
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, 'a.data')
+        _write(path, '', 16)
+        with datafile.open_text(path, KEY) as f:
+            assert_equals(f.read(), '')
+        with open(path, 'w') as f:
+            f.write('plain\n')
+        with datafile.open_text(path) as f:
+            assert_equals(f.read(), 'plain\n')
+        encrypted = os.path.join(root, 'b.data')
+        datafile.encrypt_file(path, encrypted, KEY)
+        with datafile.open_text(encrypted, KEY) as f:
+            assert_equals(f.read(), 'plain\n')
+        assert_raises(ValueError, datafile.open_text, encrypted)
+
+
+def test_tampering_detected():
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, 'a.data')
+        _write(path, 'x' * 100, 16)
+        with open(path, 'rb') as f:
+            data = f.read()
+        # magic, file id and chunk size, then chunks of 16 bytes plus tag
+        header, chunk = len(datafile.MAGIC) + 8 + 4, 16 + 16
+        truncated = data[:header + 6 * chunk]
+        swapped = data[:header] + data[header + chunk:header + 2 * chunk] + \
+            data[header:header + chunk] + data[header + 2 * chunk:]
+        flipped = data[:-1] + bytes([data[-1] ^ 1])
+        for bad in [truncated, swapped, flipped]:
+            with open(path, 'wb') as f:
+                f.write(bad)
+            # the first chunk is decrypted on opening, to see whether the
+            # file is compressed
+            assert_raises(ValueError, _read, path)
+
+
+def test_compressed():
+    text = ''.join(f'line {i}\n' for i in range(1000))
+    compressions = ['gzip'] + (['zstd'] if datafile.zstandard else [])
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, 'a.data')
+        for compression in compressions:
+            for key in [None, KEY]:
+                with open(path, 'wb') as f:
+                    with datafile.text_writer(f, key, 64, compression) as writer:
+                        writer.write(text)
+                    assert not f.closed
+                assert os.path.getsize(path) < len(text) / 2
+                assert_equals(datafile.is_encrypted(path), key is not None)
+                with datafile.open_text(path, key) as f:
+                    assert_equals(f.readline(), 'line 0\n')
+                    assert_equals(f.read(), text[len('line 0\n'):])
+
+
+def test_batch_roots_use_their_own_key():
+    with tempfile.TemporaryDirectory() as a, tempfile.TemporaryDirectory() as b:
+        key_a = datafile.KeyStore(a).create('pass a')
+        key_b = datafile.KeyStore(b).create('pass b')
+        os.environ[datafile.KEY_ENV] = key_a.hex()
+        try:
+            assert_equals(_data_key(b, 'pass b'), key_a)
+            assert_equals(_data_key(b, 'pass b', prefer_env=False), key_b)
+            # a root without a key of its own falls back to the environment's
+            with tempfile.TemporaryDirectory() as c:
+                assert_equals(_data_key(c, 'pass c', prefer_env=False), key_a)
+        finally:
+            del os.environ[datafile.KEY_ENV]
+
+
+def test_seek_encrypted():
+    text = ''.join(f'line {i}\n' for i in range(100))
+    data = text.encode()
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, 'a.data')
+        for compression in [None, 'gzip']:
+            for chunk_size in [7, 64, 4096]:
+                with open(path, 'wb') as f:
+                    with datafile.text_writer(f, KEY, chunk_size,
+                                              compression) as writer:
+                        writer.write(text)
+                with datafile.open_text(path, KEY) as f:
+                    buffer = f.buffer
+                    assert buffer.seekable()
+                    for offset in [0, 6, 7, 8, 64, 65, len(data) - 1,
+                                   len(data), len(data) + 5, 3]:
+                        buffer.seek(offset)
+                        assert_equals(buffer.read(20), data[offset:offset + 20])
+                    buffer.seek(-5, os.SEEK_END)
+                    assert_equals(buffer.read(), data[-5:])
+        _write(path, '', 16)
+        with datafile.open_text(path, KEY) as f:
+            f.buffer.seek(3)
+            assert_equals(f.buffer.read(), b'')
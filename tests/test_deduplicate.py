@@ -163,3 +163,38 @@ def test_deduplicate_both_unknown():
             'same transaction!',
             Decimal('10.00')),
         deduped)
+
+
+def test_deduplicate_repeated_charges_survive():
+    bank_to_accounts_map = {
+        'bankA': ['accountA'],
+        'bankB': ['accountB'],
+    }
+    charge = deduplicate.Reported(
+        'bankA', 'accountA', 'accountB', schema.Date(2017, 1, 1),
+        'a transaction', Decimal('10.00'))
+    other_side = charge._replace(bank='bankB', description='same transaction!')
+
+    deduped = deduplicate.deduplicate(
+        [charge, charge, other_side], bank_to_accounts_map)
+
+    assert_equals(deduped, [
+        charge._replace(bank='bankA + bankB',
+                        description='a transaction + same transaction!'),
+        charge._replace(to='unmatched: accountB'),
+    ])
+
+
+def test_merge_windows():
+    def reported(day, description='coffee'):
+        return deduplicate.Reported(
+            'bankA', 'accountA', '', schema.Date(2017, 1, day),
+            description, Decimal('3.00'))
+
+    january = [reported(1), reported(2), reported(2)]
+    overlap = [reported(2, 'COFFEE'), reported(2), reported(2), reported(3)]
+
+    merged = deduplicate.merge_windows(january, overlap)
+
+    assert_equals(merged, [reported(1), reported(2), reported(2),
+                           reported(2), reported(3)])
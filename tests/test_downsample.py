@@ -0,0 +1,19 @@
+from nose.tools import assert_equals
+from bank_wrangler.report.downsample import lttb, sample_indices
+
+
+def test_lttb_keeps_ends_and_peaks():
+    xs = list(range(100))
+    ys = [0] * 100
+    ys[37] = 50
+    ys[80] = -20
+    indices = lttb(xs, ys, 10)
+    assert_equals(len(indices), 10)
+    assert_equals(indices[0], 0)
+    assert_equals(indices[-1], 99)
+    assert 37 in indices
+    assert 80 in indices
+
+
+def test_sample_indices_short_series():
+    assert_equals(sample_indices([1, 2, 3], [[4, 5, 6]], 10), [0, 1, 2])
@@ -0,0 +1,39 @@
+import os
+import tempfile
+from nose.tools import assert_equals
+from bank_wrangler import datafile, fakebank
+from bank_wrangler.bank import fidelity
+
+
+KEY = bytes(range(32))
+
+
+def _parse(path, key):
+    with datafile.open_text(path, key) as f:
+        return fidelity.transactions_by_account(f)
+
+
+def _roundtrip(key=None, compression=None):
+    text = fakebank.ofx_response(['111', '222'], 50)
+    with tempfile.TemporaryDirectory() as root:
+        plain = os.path.join(root, 'plain.data')
+        with open(plain, 'w') as f:
+            f.write(text)
+        path = os.path.join(root, 'a.data')
+        with open(path, 'wb') as f:
+            with datafile.text_writer(f, key, compression=compression) as writer:
+                writer.write(text)
+        expected = _parse(plain, None)
+        assert_equals(sorted(expected), ['111', '222'])
+        assert_equals(_parse(path, key), expected)
+
+
+def test_encrypted():
+    _roundtrip(key=KEY)
+
+
+def test_compressed():
+    _roundtrip(compression='gzip')
+    _roundtrip(key=KEY, compression='gzip')
+    if datafile.zstandard:
+        _roundtrip(key=KEY, compression='zstd')
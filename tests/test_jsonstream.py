@@ -0,0 +1,53 @@
+from decimal import Decimal
+import io
+import json
+from nose.tools import assert_equals, assert_raises
+from bank_wrangler import jsonstream
+
+
+DOCUMENT = {
+    'data': {
+        'start_balance': 0,
+        'transactions': [{'id': i, 'amount': 1.25 * i, 'note': 'x' * i}
+                         for i in range(20)] + [[], {}, 'a"b', 12345],
+        'end_balance': 237.5,
+    },
+    'empty': [],
+}
+
+
+def _walk(reader):
+    """Rebuild the document, stepping into data and its transactions."""
+    result = {}
+    for key in reader.keys():
+        if key != 'data':
+            result[key] = reader.value()
+            continue
+        result[key] = data = {}
+        for key in reader.keys():
+            if key == 'transactions':
+                data[key] = [reader.value() for _ in reader.items()]
+            else:
+                data[key] = reader.value()
+    return result
+
+
+def test_chunk_boundaries():
+    text = json.dumps(DOCUMENT, indent=1)
+    for chunk_size in [1, 2, 3, 7, 64, 1 << 16]:
+        reader = jsonstream.Reader(io.StringIO(text), chunk_size)
+        assert_equals(_walk(reader), DOCUMENT)
+
+
+def test_kwargs_and_empty():
+    reader = jsonstream.Reader(io.StringIO('{"a": 1.10} '), 1,
+                               parse_float=Decimal)
+    assert_equals(_walk(reader), {'a': Decimal('1.10')})
+    reader = jsonstream.Reader(io.StringIO('{"data": {"transactions": []}}'))
+    assert_equals(_walk(reader), {'data': {'transactions': []}})
+
+
+def test_malformed():
+    for text in ['[1]', '{"a": 1', '{"a" 1}', '{"a": [1 2]}']:
+        with assert_raises(ValueError):
+            _walk(jsonstream.Reader(io.StringIO(text), 2))
@@ -0,0 +1,65 @@
+from decimal import Decimal
+import io
+import json
+from click.testing import CliRunner
+from nose.tools import assert_equals
+from bank_wrangler import output
+from bank_wrangler.bank_wrangler import cli
+
+
+HEADERS = ['date', 'description', 'amount']
+ROWS = [('2017/03/01', 'coffee', Decimal('3.50')),
+        ('2017/03/02', 'rent, march', Decimal('1000.00'))]
+
+
+def _write(fmt, rows, **kwargs):
+    f = io.StringIO()
+    if kwargs:
+        output.write_table(rows, HEADERS, f, **kwargs)
+    else:
+        output.write(fmt, iter(rows), HEADERS, f)
+    return f.getvalue()
+
+
+def test_table():
+    assert_equals(_write('table', ROWS).splitlines(), [
+        'date        description   amount',
+        '----------  -----------  -------',
+        '2017/03/01  coffee          3.50',
+        '2017/03/02  rent, march  1000.00',
+    ])
+    # rows past the sample are printed in full
+    assert_equals(_write('table', ROWS, sample=1).splitlines()[2:], [
+        '2017/03/01  coffee         3.50',
+        '2017/03/02  rent, march  1000.00',
+    ])
+
+
+def test_csv():
+    assert_equals(_write('csv', ROWS).splitlines(), [
+        'date,description,amount',
+        '2017/03/01,coffee,3.50',
+        '2017/03/02,"rent, march",1000.00',
+    ])
+
+
+def test_jsonl():
+    lines = _write('jsonl', ROWS).splitlines()
+    assert_equals([json.loads(line) for line in lines], [
+        {'date': '2017/03/01', 'description': 'coffee', 'amount': '3.50'},
+        {'date': '2017/03/02', 'description': 'rent, march',
+         'amount': '1000.00'},
+    ])
+
+
+def test_empty():
+    assert_equals(_write('table', []), 'date  description  amount\n'
+                                       '----  -----------  ------\n')
+    assert_equals(_write('csv', []), 'date,description,amount\r\n')
+    assert_equals(_write('jsonl', []), '')
+
+
+def test_negative_limit_rejected():
+    result = CliRunner().invoke(cli, ['list', '--limit', '-1'])
+    assert_equals(result.exit_code, 2)
+    assert '--limit' in result.output
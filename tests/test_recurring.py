@@ -0,0 +1,46 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from nose.tools import assert_equals
+from bank_wrangler import schema
+from bank_wrangler.recurring import detect
+
+
+def _transaction(d, description, amount):
+    return schema.Transaction('checking', '', schema.Date(d.year, d.month, d.day),
+                              description, Decimal(amount))
+
+
+def _monthly(description, amounts, skip=()):
+    return [_transaction(date(2017, month, 31 if month in (1, 3, 5) else 28),
+                         description, amount)
+            for month, amount in enumerate(amounts, 1) if month not in skip]
+
+
+def test_monthly_subscription():
+    transactions = (
+        _monthly('NETFLIX.COM 1234', ['9.99'] * 5 + ['11.99']) +
+        _monthly('SPOTIFY 99', ['4.99'] * 6, skip=[3]) +
+        # weekly, but the amounts are too different to be one payment
+        [_transaction(date(2017, 1, 2) + timedelta(weeks=i), 'GROCER',
+                      str(10 + 25 * (i % 3))) for i in range(20)]
+    )
+    found = detect(transactions, as_of=schema.Date(2017, 7, 1))
+    assert_equals([(r.description, r.period, r.count, r.missed)
+                   for r in found],
+                  [('NETFLIX.COM 1234', 'monthly', 6, 0),
+                   ('SPOTIFY 99', 'monthly', 5, 1)])
+    netflix, spotify = found
+    assert_equals(netflix.next_date, schema.Date(2017, 7, 28))
+    assert netflix.amount_changed and not spotify.amount_changed
+    assert_equals(netflix.typical, Decimal('9.99'))
+    assert not netflix.overdue
+    later = detect(transactions, as_of=schema.Date(2017, 9, 1))
+    assert all(r.overdue for r in later)
+
+
+def test_weekly():
+    transactions = [_transaction(date(2017, 1, 2) + timedelta(weeks=i),
+                                 'GYM', '15.00') for i in range(8)]
+    [gym] = detect(transactions, as_of=schema.Date(2017, 2, 27))
+    assert_equals(gym.period, 'weekly')
+    assert_equals(gym.next_date, schema.Date(2017, 2, 27))
@@ -0,0 +1,66 @@
+from decimal import Decimal
+import tempfile
+from nose.tools import assert_equals
+from bank_wrangler import rules, schema, stitch
+from bank_wrangler.rules import Rules
+
+
+OLD_DESCRIPTION = '{"other": "bob", "note": "rent"}'
+
+
+def _venmo():
+    return schema.Transaction('me', '', schema.Date(2017, 1, 1), '',
+                              Decimal('500.00'),
+                              meta=schema.Meta('bob', 'rent', 'Venmo balance', '1'))
+
+
+def _old_rules(root, accepted):
+    """Rules with a block of accepted categories as appended before meta."""
+    r = Rules(root)
+    r.write_boilerplate()
+    old_block = rules.accepted_categories_template.split('def ')[0] + \
+        'def post_stitch(transaction, _previous=post_stitch, _accepted={!r}):\n' \
+        '    transaction = _previous(transaction)\n' + rules._old_lookup + \
+        '    return transaction\n'
+    with open(r.path, 'a') as f:
+        f.write(old_block.format(accepted))
+    return r
+
+
+def test_migrate_old_accepted_categories():
+    assert_equals(schema.legacy_description(_venmo()), OLD_DESCRIPTION)
+    with tempfile.TemporaryDirectory() as root:
+        r = _old_rules(root, {OLD_DESCRIPTION: 'Rent'})
+        assert_equals(r.get_module().post_stitch(_venmo()).category, 'Unknown')
+        assert_equals(r.migrate(), 1)
+        assert_equals(r.migrate(), 0)
+        assert_equals(r.get_module().post_stitch(_venmo()).category, 'Rent')
+
+        # new blocks match rendered and old descriptions
+        r.add_categories({'alice: pizza': 'Food',
+                          '{"other": "carol", "note": "gym"}': 'Fitness'})
+        module = r.get_module()
+        for meta, category in [(schema.Meta('alice', 'pizza'), 'Food'),
+                               (schema.Meta('carol', 'gym'), 'Fitness')]:
+            t = _venmo()._replace(meta=meta)
+            assert_equals(module.post_stitch(t).category, category)
+
+
+def test_migrate_stitched():
+    venmo = _venmo()._replace(source='checking', to='me')
+    bank = schema.Transaction('checking', 'me', venmo.date, 'ACH VENMO',
+                              venmo.amount)
+    matched, = stitch.stitch({'checking': [bank], 'me': [venmo]})
+    missing, = stitch.stitch({'checking': [], 'me': [venmo]})
+    assert_equals(schema.describe(matched), 'bob: rent + ACH VENMO')
+    # as stitch wrote them into the description before meta
+    old_matched = OLD_DESCRIPTION + ' + ACH VENMO'
+    old_missing = OLD_DESCRIPTION + ' [missing corresponding txn in checking]'
+    assert_equals(schema.legacy_description(matched), old_matched)
+    assert_equals(schema.legacy_description(missing), old_missing)
+    with tempfile.TemporaryDirectory() as root:
+        r = _old_rules(root, {old_matched: 'Rent', old_missing: 'Transfer'})
+        r.migrate()
+        module = r.get_module()
+        assert_equals(module.post_stitch(matched).category, 'Rent')
+        assert_equals(module.post_stitch(missing).category, 'Transfer')
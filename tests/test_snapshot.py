@@ -0,0 +1,78 @@
+import os
+import tempfile
+from nose.tools import assert_equals, assert_raises
+from bank_wrangler import snapshot
+
+
+def _write(root, name, text):
+    with snapshot.writer(root) as w:
+        with open(w.new_path(name), 'w') as f:
+            f.write(text)
+
+
+def _read(path):
+    with open(path) as f:
+        return f.read()
+
+
+def test_legacy_file_replaced():
+    with tempfile.TemporaryDirectory() as root:
+        with open(os.path.join(root, 'a.data'), 'w') as f:
+            f.write('old')
+        with snapshot.reader(root) as s:
+            assert_equals(s.generation, 0)
+            assert_equals(_read(s.path('a.data')), 'old')
+        _write(root, 'a.data', 'new')
+        with snapshot.reader(root) as s:
+            assert_equals(s.generation, 1)
+            assert_equals(_read(s.path('a.data')), 'new')
+        assert not os.path.exists(os.path.join(root, 'a.data'))
+
+
+def test_reader_keeps_its_generation():
+    with tempfile.TemporaryDirectory() as root:
+        _write(root, 'a.data', 'one')
+        with snapshot.reader(root) as s:
+            _write(root, 'a.data', 'two')
+            _write(root, 'a.data', 'three')
+            assert_equals(_read(s.path('a.data')), 'one')
+            assert_equals(_read(snapshot.current(root).path('a.data')), 'three')
+        _write(root, 'b.data', 'other')
+        files = sorted(f for f in os.listdir(root) if '.data' in f)
+        assert_equals(files, ['a.data.3', 'b.data.4'])
+
+
+def test_writer_aborts():
+    with tempfile.TemporaryDirectory() as root:
+        _write(root, 'a.data', 'one')
+        with assert_raises(ValueError):
+            with snapshot.writer(root) as w:
+                with open(w.new_path('a.data'), 'w') as f:
+                    f.write('partial')
+                raise ValueError
+        with snapshot.reader(root) as s:
+            assert_equals(_read(s.path('a.data')), 'one')
+        assert not os.path.exists(os.path.join(root, 'a.data.2'))
+
+
+def test_new_files_synced_before_publishing():
+    synced = []
+    original = snapshot._fsync
+
+    def record(path, directory=False):
+        published = snapshot._load(root)['generation']
+        synced.append((os.path.basename(path), published))
+        original(path, directory)
+
+    with tempfile.TemporaryDirectory() as root:
+        snapshot._fsync = record
+        try:
+            with snapshot.writer(root) as w:
+                for name in ('vault', 'vault-keys'):
+                    with open(w.new_path(name), 'w') as f:
+                        f.write(name)
+        finally:
+            snapshot._fsync = original
+        assert_equals(sorted(synced), [
+            (os.path.basename(root), 0), ('vault-keys.1', 0), ('vault.1', 0)])
+        assert_equals(snapshot._load(root)['generation'], 1)
@@ -0,0 +1,97 @@
+from decimal import Decimal
+import tempfile
+from nose.tools import assert_equals, assert_raises
+from bank_wrangler import schema, stitch
+
+
+def _t(source, to, day, description, amount='10.00'):
+    return schema.Transaction(source, to, schema.Date(2017, 1, day),
+                              description, Decimal(amount))
+
+
+def _accounts():
+    return {
+        'checking': [
+            _t('', 'checking', 1, 'paycheck', '100.00'),
+            _t('checking', 'savings', 2, 'out'),
+            _t('checking', 'savings', 2, 'out again'),
+            _t('checking', 'savings', 3, 'never arrived'),
+        ],
+        'savings': [
+            _t('checking', 'savings', 2, 'in'),
+        ],
+    }
+
+
+def test_stitch():
+    result = stitch.stitch(_accounts())
+    assert_equals([(t.source, t.to, t.description) for t in result], [
+        ('', 'checking', 'paycheck'),
+        ('checking', '', 'out again'),
+        ('checking', '', 'never arrived'),
+        ('checking', 'savings', 'in'),
+    ])
+    assert_equals(list(map(schema.describe, result)), [
+        'paycheck',
+        'out again [missing corresponding txn in savings]',
+        'never arrived [missing corresponding txn in savings]',
+        'in + out',
+    ])
+    assert_equals(result[0].meta, None)
+    assert_equals(result[3].meta, schema.Meta(matched=('out', None)))
+
+
+def test_stitch_unknown_account():
+    with assert_raises(ValueError):
+        stitch.stitch({'checking': [_t('checking', 'elsewhere', 1, 'x')]})
+
+
+def test_incremental_matches_full():
+    accounts = _accounts()
+    versions = {'checking': 'c1', 'savings': 's1'}
+
+    def run(root):
+        result, recomputed = stitch.StitchState(root).stitch(accounts, versions, verify=True)
+        assert_equals(result, stitch.stitch(accounts))
+        return recomputed
+
+    with tempfile.TemporaryDirectory() as root:
+        assert_equals(run(root), 2)
+        assert_equals(run(root), 0)
+
+        # only the group a transfer is added to or removed from is matched
+        accounts['savings'].append(_t('checking', 'savings', 2, 'in again'))
+        versions['savings'] = 's2'
+        assert_equals(run(root), 1)
+        accounts['savings'][-1] = _t('', 'savings', 1, 'interest', '0.01')
+        versions['savings'] = 's3'
+        assert_equals(run(root), 1)
+
+        # other changes reuse the saved matches
+        accounts['savings'][0] = _t('checking', 'savings', 2, 'in, renamed', '10.0')
+        versions['savings'] = 's4'
+        assert_equals(run(root), 0)
+
+        # a new account changes the order within groups
+        accounts['brokerage'] = []
+        versions['brokerage'] = 'b1'
+        assert_equals(run(root), 2)
+
+        # without versions nothing is reused
+        _, recomputed = stitch.StitchState(root).stitch(accounts)
+        assert_equals(recomputed, 2)
+
+
+def test_stitch_renders_meta():
+    meta = schema.Meta(counterparty='friend', note='pizza')
+    t = _t('checking', 'venmo', 4, '')._replace(meta=meta)
+    assert_equals(schema.describe(t), 'friend: pizza')
+    assert_equals(schema.from_row(schema.to_row(t)), t)
+    accounts = {'checking': [t], 'venmo': [_t('checking', 'venmo', 4, 'in')]}
+    result, = stitch.stitch(accounts)
+    assert_equals(result.description, 'in')
+    assert_equals(schema.describe(result), 'in + friend: pizza')
+    # the venmo side's meta is kept, so post_stitch rules can read it
+    assert_equals(result.meta.counterparty, 'friend')
+    assert_equals(result.meta.matched, ('', meta))
+    assert_equals(schema.from_row(schema.to_row(result)), result)
@@ -0,0 +1,26 @@
+from decimal import Decimal
+from nose.tools import assert_equals
+from bank_wrangler import schema, suggest
+
+
+def _t(description, category='Unknown'):
+    return schema.Transaction('checking', '', schema.Date(2017, 1, 1),
+                              description, Decimal('1.00'), category)
+
+
+def test_suggest_all():
+    transactions = [
+        _t('SAFEWAY #1234 SEATTLE WA', 'Groceries'),
+        _t('SAFEWAY #0042 SEATTLE WA', 'Groceries'),
+        _t('SHELL OIL 5551 SEATTLE WA', 'Gas'),
+        _t('SAFEWAY #9999 PORTLAND OR'),
+        _t('SAFEWAY #9999 PORTLAND OR'),
+        _t('SHEL OIL 1234'),
+        _t('ZZZ'),
+    ]
+    suggestions = suggest.suggest_all(transactions, k=1)
+    assert_equals([(d, n, [c for c, _ in best]) for d, n, best in suggestions], [
+        ('SAFEWAY #9999 PORTLAND OR', 2, ['Groceries']),
+        ('SHEL OIL 1234', 1, ['Gas']),
+        ('ZZZ', 1, []),
+    ])
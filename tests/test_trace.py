@@ -0,0 +1,31 @@
+import json
+import os
+import tempfile
+from nose.tools import assert_equals
+from bank_wrangler import trace
+
+
+def test_nested_spans():
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, 'trace.json')
+        trace.enable()
+        with trace.span('outer') as outer:
+            with trace.span('inner') as inner:
+                # freed before outer ends, so outer only sees it via inner
+                data = bytearray(4 * 1024 * 1024)
+                inner['rows'] = len(data)
+                del data
+            outer['rows'] = 1
+        trace.write(path)
+        assert not trace.enabled()
+        with open(path) as f:
+            events = json.load(f)['traceEvents']
+    assert_equals([e['name'] for e in events], ['inner', 'outer'])
+    for event in events:
+        assert_equals(event['ph'], 'X')
+        assert 'rows' in event['args']
+        assert 'peak_memory_bytes' in event['args']
+        assert event['dur'] >= 0
+    inner, outer = (e['args'] for e in events)
+    assert inner['peak_memory_bytes'] >= 4 * 1024 * 1024
+    assert outer['peak_memory_bytes'] >= inner['peak_memory_bytes']
@@ -0,0 +1,16 @@
+import io
+from nose.tools import assert_equals
+from bank_wrangler import fakebank, schema
+from bank_wrangler.bank import venmo
+
+
+def test_meta_filled_directly():
+    text = 'me\n' + fakebank.venmo_history('me', 3)
+    transactions = venmo.transactions_by_account(io.StringIO(text))['me']
+    assert_equals(len(transactions), 3)
+    t = transactions[0]
+    assert_equals(t.description, '')
+    assert_equals(t.meta.counterparty, 'friend-0')
+    assert_equals(t.meta.funding_source, 'Venmo balance')
+    assert_equals(t.meta.raw_id, '1000000')
+    assert_equals(schema.describe(t), 'friend-0: ' + t.meta.note)
@@ -0,0 +1,55 @@
+import tempfile
+from nose.tools import assert_equals, assert_raises
+from bank_wrangler import fakebank, snapshot
+from bank_wrangler.rules import Rules
+from bank_wrangler.watch import Watcher
+
+
+BANKS = {'a': 'Venmo', 'b': 'Venmo'}
+
+
+def _publish(root, **texts):
+    with snapshot.writer(root) as w:
+        for key, text in texts.items():
+            with open(w.new_path(key + '.data'), 'w') as f:
+                f.write(text)
+
+
+def _venmo(username, rows):
+    return username + '\n' + fakebank.venmo_history(username, rows)
+
+
+def _watcher(root):
+    Rules(root).write_boilerplate()
+    _publish(root, a=_venmo('alice', 3), b=_venmo('bob', 4))
+    watcher = Watcher(root, BANKS)
+    watcher.update({'rules.py', 'a.data', 'b.data'})
+    return watcher
+
+
+def test_incremental_update():
+    with tempfile.TemporaryDirectory() as root:
+        watcher = _watcher(root)
+        alice = watcher.pre['alice']
+        _publish(root, b=_venmo('bob', 5))
+        written = watcher.update({'b.data'})
+        assert 'data.js' in written
+        # only the changed bank was parsed again
+        assert watcher.pre['alice'] is alice
+        assert_equals(len(watcher.pre['bob']), 5)
+        assert_equals(watcher.update(set()), [])
+
+
+def test_recover_from_failed_update():
+    with tempfile.TemporaryDirectory() as root:
+        watcher = _watcher(root)
+        _publish(root, a=_venmo('alice', 6), b='bob\nnot json')
+        with assert_raises(ValueError):
+            watcher.update({'a.data', 'b.data'})
+        assert_equals(len(watcher.pre['alice']), 3)
+        assert_equals(len(watcher.pre['bob']), 4)
+        # a.data is not named again, but its parse was not kept
+        _publish(root, b=_venmo('bob', 2))
+        watcher.update({'b.data'})
+        assert_equals(len(watcher.pre['alice']), 6)
+        assert_equals(len(watcher.pre['bob']), 2)